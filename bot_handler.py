@@ -1,59 +1,239 @@
+import io
 import os
+import sys
 import asyncio
+import functools
 import logging
+import multiprocessing
 import html
+import re
+from bisect import bisect_left, bisect_right
+from collections import defaultdict
+from heapq import heappop, heappush, merge
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime, timezone
+from itertools import count, zip_longest
+from operator import itemgetter, sub
 from telegram import Update, InlineKeyboardMarkup, InlineKeyboardButton
+from telegram.constants import ParseMode
+from telegram.error import RetryAfter
+from telegram.request import HTTPXRequest
 from telegram.ext import (Application, CommandHandler, CallbackQueryHandler,
                            ContextTypes, MessageHandler, filters)
 from config import BOT_TOKEN, ADMIN_ID, CHANNEL_USERNAME, USER_PHONE
 
 logger = logging.getLogger(__name__)
 
-# Ensemble de tâches de suppression pour éviter le garbage collection
-_pending_deletions: set = set()
+# ID de canal numérique (ex: -1001234567890)
+_NUMERIC_ID_RE = re.compile(r'-?\d+')
+# Saisie de commandes numérotées : "3" ou plage "1-5" (séparateurs libres)
+_PERM_RE = re.compile(r'(\d+)(?:-(\d+))?')
+# Assignation de rôle dans /predictsetup : "1=S", "2 = p"...
+_PREDICT_RE = re.compile(r'([^\s,=]*)\s*=\s*([^\s,]*)')
+_ROLE_MAP = {'s': 'stats', 'stats': 'stats', 'p': 'predictor', 'predicteur': 'predictor', 'predictor': 'predictor'}
+_ROLE_LABELS = {'stats': '📊 STATS', 'predictor': '🎯 PRÉDICTEUR'}
+
+# Suppressions différées : tas (échéance, n°, message) vidé par une seule tâche
+_delete_heap: list = []
+_delete_seq = count()
+_delete_wakeup = asyncio.Event()
+_delete_worker_task = None
 
 def _max_ecart(nums):
     """Calcule l'écart maximum entre numéros consécutifs triés."""
     if len(nums) < 2:
         return 0
-    s = sorted(int(n) for n in nums)
-    return max(s[i+1] - s[i] for i in range(len(s)-1))
+    return _max_gap_sorted(sorted(map(int, nums)))
 
-async def _delete_after_delay(msg, delay: int):
-    await asyncio.sleep(delay)
-    try:
-        await msg.delete()
-        logger.info(f"Message {msg.message_id} supprimé après {delay}s")
-    except Exception as e:
-        logger.warning(f"Impossible de supprimer message {msg.message_id}: {e}")
+def _max_gap_sorted(s):
+    """Écart maximum d'une liste d'entiers déjà triée."""
+    if len(s) < 2:
+        return 0
+    # map(sub) : différences consécutives calculées en C, sans boucle Python
+    return max(map(sub, s[1:], s))
+
+async def _delete_worker():
+    """Supprime les messages à échéance, un par un, via le limiteur d'envoi global."""
+    loop = asyncio.get_running_loop()
+    while True:
+        if not _delete_heap:
+            _delete_wakeup.clear()
+            await _delete_wakeup.wait()
+            continue
+        wait = _delete_heap[0][0] - loop.time()
+        if wait > 0:
+            # Réveil anticipé si une échéance plus proche est ajoutée
+            _delete_wakeup.clear()
+            try:
+                await asyncio.wait_for(_delete_wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+            continue
+        _, _, msg = heappop(_delete_heap)
+        try:
+            await _send(msg.delete)
+            logger.info(f"Message {msg.message_id} supprimé")
+        except Exception as e:
+            logger.warning(f"Impossible de supprimer message {msg.message_id}: {e}")
 
 def _schedule_delete(msg, delay: int = 10):
-    task = asyncio.create_task(_delete_after_delay(msg, delay))
-    _pending_deletions.add(task)
-    task.add_done_callback(_pending_deletions.discard)
+    global _delete_worker_task
+    heappush(_delete_heap, (asyncio.get_running_loop().time() + delay, next(_delete_seq), msg))
+    if _delete_worker_task is None or _delete_worker_task.done():
+        _delete_worker_task = asyncio.create_task(_delete_worker())
+    _delete_wakeup.set()
+
+# Cadence d'envoi : ~28 msg/s au plus pour les messages courts (limite globale de
+# 30 msg/s de Telegram), davantage d'espacement pour les messages longs.
+_SEND_INTERVAL = 0.035
+_send_lock = asyncio.Lock()
+_last_send = 0.0
+
+def _send_interval(text: str) -> float:
+    """Intervalle minimal avant l'envoi de `text`, selon sa longueur."""
+    n = len(text)
+    return _SEND_INTERVAL if n <= 1024 else 0.10 if n <= 3000 else 0.20
+
+async def _pace(text: str = ''):
+    """Attend seulement le reliquat d'intervalle depuis le dernier envoi du processus."""
+    global _last_send
+    async with _send_lock:
+        loop = asyncio.get_running_loop()
+        wait = _last_send + _send_interval(text) - loop.time()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        _last_send = loop.time()
+
+async def _paced_send(message, text: str, **kwargs):
+    """reply_text cadencé par le limiteur global."""
+    await _pace(text)
+    return await message.reply_text(text, **kwargs)
+
+async def _send(coro_factory, text: str = ''):
+    """Appel sortant quelconque (send_document…) cadencé par le limiteur global."""
+    await _pace(text)
+    return await coro_factory()
+
+
+# Au-delà de ces seuils, /search produit un PDF plutôt qu'un message
+_INLINE_MAX_RESULTS = 25
+_INLINE_MAX_CHARS = 3800
+
+
+def _fmt_local_hit(i: int, p: dict) -> str:
+    date_str = str(p.get('date') or '')[:10]
+    raw = html.escape((p.get('raw_text') or '')[:200], quote=False)
+    couleur = html.escape(str(p.get('couleur', '')), quote=False)
+    statut = html.escape(str(p.get('statut', '')), quote=False)
+    return (f"<b>#{i}</b> — Message #{p.get('numero', '?')} | {couleur} | "
+            f"{statut} | {date_str}\n{raw}")
+
+
+def _fmt_channel_hit(i: int, m: dict) -> str:
+    date_str = str(m.get('date') or '')[:16]
+    raw = html.escape((m.get('text') or '')[:300], quote=False)
+    return f"<b>#{i}</b> — ID: {m.get('id', '?')} | {date_str}\n{raw}"
+
+
+def _format_search_inline(results: list, keywords: list, fmt) -> str:
+    """Résultats de /search en un seul message HTML, ou '' s'ils sont trop nombreux/longs."""
+    if not results or len(results) > _INLINE_MAX_RESULTS:
+        return ''
+    text = (f"🔍 <b>Recherche : {html.escape(' '.join(keywords), quote=False)}</b>\n"
+            f"✅ {len(results)} message(s) trouvé(s)\n\n"
+            + '\n\n'.join(fmt(i, r) for i, r in enumerate(results, 1)))
+    return text if len(text) <= _INLINE_MAX_CHARS else ''
+
+
+def _safe_unlink(path: str):
+    """Supprime un fichier temporaire en un seul appel système, sans erreur s'il a disparu."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+def _retry_seconds(e: RetryAfter) -> float:
+    """Délai imposé par un RetryAfter (entier ou timedelta selon la version de PTB)."""
+    ra = e.retry_after
+    return ra.total_seconds() if hasattr(ra, 'total_seconds') else float(ra)
+
+
+class ThrottledEditor:
+    """Éditions de progression d'un message : au plus une par intervalle (tête + queue).
+
+    Seul le dernier texte en attente est publié ; les intermédiaires sont abandonnés.
+    """
+
+    def __init__(self, msg, interval: float = 1.0, **edit_kwargs):
+        self._msg = msg
+        self._interval = interval
+        self._edit_kwargs = edit_kwargs
+        self._pending = None
+        self._last_sent = None
+        self._task = None
+
+    def set_text(self, text: str):
+        self._pending = text
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._publish())
+
+    async def _publish(self):
+        while self._pending is not None:
+            text, self._pending = self._pending, None
+            # Texte identique : Telegram répondrait 400 « message is not modified »
+            if text == self._last_sent:
+                continue
+            try:
+                await self._msg.edit_text(text, **self._edit_kwargs)
+                self._last_sent = text
+            except RetryAfter as e:
+                # Flood control : attendre le délai imposé, puis republier le plus récent
+                if self._pending is None:
+                    self._pending = text
+                await asyncio.sleep(_retry_seconds(e))
+                continue
+            except Exception:
+                pass
+            await asyncio.sleep(self._interval)
+
+    async def flush(self, text: str = None, **kwargs):
+        """Arrête le publieur et applique immédiatement le texte final."""
+        self._pending = None
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if text is not None and text != self._last_sent:
+            await self._msg.edit_text(text, **kwargs)
+            self._last_sent = text
+
 
 from storage import (get_predictions, get_stats, clear_all, search_predictions,
                      get_channels, add_channel, remove_channel,
                      get_active_channel, set_active_channel,
                      get_analyzed_games, save_analyzed_games, clear_analyzed_games,
+                     analyzed_games_signature, games_version,
                      get_admins, get_admins_with_permissions, get_admin_permissions,
-                     has_permission, add_admin, remove_admin, update_admin_permissions,
+                     get_admin_permission_set, get_admin_id_set, add_admin, remove_admin, update_admin_permissions,
                      get_predict_config, save_predict_config, set_channel_role,
                      get_stats_channels, get_predictor_channels, reset_predict_config,
                      reset_all_data, ALL_COMMANDS)
 from game_analyzer import (parse_game, format_analysis, build_category_stats,
-                           format_ecarts, normalize_suit, SUIT_EMOJI)
+                           format_ecarts, normalize_suit, status_kind, SUIT_EMOJI, FACE_CARDS)
 from predictor import (generate_category_list, format_category_list,
                        build_predict_data, format_global_summary)
-from scraper import scraper
+from scraper import scraper, _client_lock
 from auth_manager import auth_manager
-from pdf_generator import generate_pdf, generate_search_pdf, generate_channel_search_pdf
-from pdf_analyzer import analyze_pdf
+from pdf_generator import (generate_pdf, generate_search_pdf, generate_channel_search_pdf,
+                           generate_documentation_pdf)
+from pdf_analyzer import analyze_pdf_bytes
 
 def is_admin(user_id: int) -> bool:
     """Vrai si l'utilisateur est dans la liste des admins (incluant le main admin)."""
-    return user_id in get_admins()
+    return user_id == ADMIN_ID or user_id in get_admin_id_set()
 
 def is_main_admin(user_id: int) -> bool:
     """Vrai uniquement pour l'admin principal (commandes sensibles)."""
@@ -119,60 +299,236 @@ def parse_search_options(args: list):
     return keywords, limit, from_date, to_date
 
 
-def _filter_games_by_date(games: list, from_date=None, to_date=None) -> list:
-    """Filtre une liste de jeux par plage de dates (champ 'date' du jeu)."""
-    if not from_date and not to_date:
-        return games
-    result = []
+# Python 3.11+ : fromisoformat accepte nativement le suffixe 'Z'
+_ISO_Z_NATIVE = sys.version_info >= (3, 11)
+if _ISO_Z_NATIVE:
+    _parse_iso = datetime.fromisoformat
+else:
+    def _parse_iso(s: str):
+        return datetime.fromisoformat(s.replace('Z', '+00:00'))
+
+
+# Cache du dernier tri par date : la liste source est conservée (référence forte)
+# pour que son id() ne puisse pas être réutilisé par une autre liste. `version`
+# (signature du fichier des jeux) permet aussi de réutiliser le tri pour une
+# nouvelle lecture du même fichier.
+_sorted_cache: dict = {'games': None, 'version': None, 'len': 0,
+                       'dates': [], 'dated': [], 'undated': []}
+
+
+def _sorted_by_date(games: list, version=None):
+    """Retourne (dates triées, jeux datés triés, jeux sans date valide) pour `games`."""
+    c = _sorted_cache
+    if c['len'] == len(games) and (
+            c['games'] is games or (version is not None and c['version'] == version)):
+        return c['dates'], c['dated'], c['undated']
+    pairs = []
+    undated = []
     for g in games:
         date_str = g.get('date', '')
         if not date_str:
-            result.append(g)
+            undated.append(g)
             continue
         try:
-            dt = datetime.fromisoformat(str(date_str).replace('Z', '+00:00'))
-            if dt.tzinfo is None:
-                dt = dt.replace(tzinfo=timezone.utc)
-            if from_date and dt < from_date:
-                continue
-            if to_date and dt > to_date:
-                continue
-            result.append(g)
+            dt = _parse_iso(str(date_str))
         except Exception:
-            result.append(g)
-    return result
-
-# État de la conversation : attend un ID de canal de l'admin
-_waiting_for_channel = {}
-# État : attend un enregistrement de jeu pour analyse
-_waiting_for_game = {}
-# Flags d'annulation par utilisateur pour les recherches en cours
-_search_cancel: dict[int, bool] = {}
-# État : attend la sélection de commandes pour un nouvel admin
-# {main_admin_uid: {'target_uid': int, 'action': 'add'|'update'}}
-_waiting_for_perm: dict[int, dict] = {}
-# État : attend le choix du canal dans /helpcl
-_waiting_for_helpcl: dict[int, bool] = {}
-# État : attend la saisie des rôles dans /predictsetup
-# {uid: {'step': str, 'channels': list}}
-_waiting_for_predict: dict[int, dict] = {}
+            undated.append(g)
+            continue
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=timezone.utc)
+        pairs.append((dt, g))
+    pairs.sort(key=lambda p: p[0])
+    c['games'] = games
+    c['version'] = version
+    c['len'] = len(games)
+    c['dates'] = [p[0] for p in pairs]
+    c['dated'] = [p[1] for p in pairs]
+    c['undated'] = undated
+    return c['dates'], c['dated'], c['undated']
+
+
+def _filter_games_by_date(games: list, from_date=None, to_date=None, version=None) -> list:
+    """Filtre une liste de jeux par plage de dates (champ 'date' du jeu).
+
+    Les jeux sans date exploitable sont toujours conservés ; les autres sont
+    triés une fois par date puis sélectionnés par recherche dichotomique.
+    `version` identifie le contenu de `games` (ex. analyzed_games_signature())
+    pour garder le tri d'une lecture du fichier à l'autre.
+    """
+    if not from_date and not to_date:
+        return games
+    dates, dated, undated = _sorted_by_date(games, version)
+    lo = bisect_left(dates, from_date) if from_date else 0
+    hi = bisect_right(dates, to_date) if to_date else len(dates)
+    return undated + dated[lo:hi]
+
+def _format_scope(limit, from_date, to_date) -> str:
+    """Suffixe décrivant la portée d'une recherche (/hsearch, /gload)."""
+    if limit:
+        return f" | 🔢 {limit} derniers messages"
+    if from_date and to_date:
+        return f" | 📅 {from_date:%d/%m/%Y %H:%M} → {to_date:%d/%m/%Y %H:%M}"
+    if from_date:
+        return f" | 📅 depuis {from_date:%d/%m/%Y %H:%M}"
+    if to_date:
+        return f" | 📅 jusqu'au {to_date:%d/%m/%Y %H:%M}"
+    return ''
+
+# Dernier build_category_stats, valable tant que games_version() n'a pas changé
+# et que get_analyzed_games() renvoie le même instantané (fichier inchangé)
+_cats_cache: dict = {'version': None, 'games': None, 'cats': None}
+
+
+def _get_cached_cats(games: list) -> dict:
+    """build_category_stats(games) mémorisé ; `games` doit être le jeu complet stocké."""
+    v = games_version()
+    if _cats_cache['version'] != v or _cats_cache['games'] is not games:
+        _cats_cache['cats'] = build_category_stats(games)
+        _cats_cache['version'] = v
+        _cats_cache['games'] = games
+    return _cats_cache['cats']
+
+def _find_max_pair(nums):
+    """((n1, n2), écart) de l'écart maximum entre numéros triés ; (None, 0) si moins de 2."""
+    if len(nums) < 2:
+        return None, 0
+    s = sorted(map(int, nums))
+    diffs = list(map(sub, s[1:], s))
+    max_diff = max(diffs)
+    # index() renvoie la première occurrence, comme l'ancienne boucle
+    i = diffs.index(max_diff)
+    return (s[i], s[i + 1]), max_diff
+
+# Clé de tri des jeux par numéro (entier précalculé par parse_game)
+_by_numero = itemgetter('numero_int')
+
+# Résultats de _find_max_pair par (groupe, clé), valables pour un objet `cats` donné
+_max_pair_cache: dict = {'cats': None, 'pairs': {}}
+
+
+def _cached_max_pair(cats: dict, group: str, key: str):
+    """_find_max_pair(cats[group][key]) mémorisé tant que `cats` est le même objet."""
+    if _max_pair_cache['cats'] is not cats:
+        _max_pair_cache['cats'] = cats
+        _max_pair_cache['pairs'] = {}
+    pairs = _max_pair_cache['pairs']
+    k = (group, key)
+    if k not in pairs:
+        pairs[k] = _find_max_pair(cats.get(group, {}).get(key, []))
+    return pairs[k]
+
+# Catégories de /gecartmax : (libellé, groupe de build_category_stats, clé)
+_CATEGORY_SPECS = [
+    ("🏆 Victoire Joueur",            'victoire', 'JOUEUR'),
+    ("🏆 Victoire Banquier",          'victoire', 'BANQUIER'),
+    ("🏆 Victoire Nul",               'victoire', 'NUL'),
+    ("📊 Parité Pair",                'parite', 'PAIR'),
+    ("📊 Parité Impair",              'parite', 'IMPAIR'),
+    ("🎴 Structure 2/2",              'structure', '2/2'),
+    ("🎴 Structure 2/3",              'structure', '2/3'),
+    ("🎴 Structure 3/2",              'structure', '3/2'),
+    ("🎴 Structure 3/3",              'structure', '3/3'),
+    ("🎯 Plus/Moins Joueur +6.5",     'plusmoins_j', 'Plus de 6,5'),
+    ("🎯 Plus/Moins Joueur -4.5",     'plusmoins_j', 'Moins de 4,5'),
+    ("🎯 Plus/Moins Joueur Neutre",   'plusmoins_j', 'Neutre'),
+    ("🎯 Plus/Moins Banquier +6.5",   'plusmoins_b', 'Plus de 6,5'),
+    ("🎯 Plus/Moins Banquier -4.5",   'plusmoins_b', 'Moins de 4,5'),
+    ("🎯 Plus/Moins Banquier Neutre", 'plusmoins_b', 'Neutre'),
+    ("♠️ Manquant Joueur ♠",         'missing_j', '♠'),
+    ("♥️ Manquant Joueur ♥",         'missing_j', '♥'),
+    ("♦️ Manquant Joueur ♦",         'missing_j', '♦'),
+    ("♣️ Manquant Joueur ♣",         'missing_j', '♣'),
+    ("♠️ Manquant Banquier ♠",       'missing_b', '♠'),
+    ("♥️ Manquant Banquier ♥",       'missing_b', '♥'),
+    ("♦️ Manquant Banquier ♦",       'missing_b', '♦'),
+    ("♣️ Manquant Banquier ♣",       'missing_b', '♣'),
+    ("🃏 Joueur As",                  'face_j', 'A'),
+    ("🃏 Joueur Roi",                 'face_j', 'K'),
+    ("🃏 Joueur Dame",                'face_j', 'Q'),
+    ("🃏 Joueur Valet",               'face_j', 'J'),
+    ("🃏 Banquier As",                'face_b', 'A'),
+    ("🃏 Banquier Roi",               'face_b', 'K'),
+    ("🃏 Banquier Dame",              'face_b', 'Q'),
+    ("🃏 Banquier Valet",             'face_b', 'J'),
+]
+_CATEGORY_SPECS += [
+    (f"🃏 {label}{SUIT_EMOJI[suit]} {side_l}", side_k, f'{fc}{suit}')
+    for fc, label in (('A', 'As'), ('K', 'Roi'), ('Q', 'Dame'), ('J', 'Valet'))
+    for suit in ('♠', '♥', '♦', '♣')
+    for side_k, side_l in (('face_suit_j', 'Joueur'), ('face_suit_b', 'Banquier'))
+]
+_CATEGORY_SPECS = tuple(_CATEGORY_SPECS)
+
+# Verrou par discussion pour les tâches longues lancées en arrière-plan
+_chat_locks: dict[int, asyncio.Lock] = defaultdict(asyncio.Lock)
+
+# Numéros triés du dernier /gpredict, par (signature du fichier, from, to)
+_sorted_nums_cache: dict = {'key': None, 'nums': None}
+
+# Événements d'annulation par utilisateur pour les recherches en cours
+_search_cancel: dict[int, asyncio.Event] = {}
+
+# État d'attente de saisie, un seul par utilisateur : {uid: (type, état)}
+#   'channel' : attend un ID de canal de l'admin (état : True)
+#   'game'    : attend un enregistrement de jeu pour analyse (True)
+#   'perm'    : attend la sélection de commandes pour un admin
+#               ({'target_uid': int, 'action': 'add'|'update'})
+#   'helpcl'  : attend le choix du canal dans /helpcl (True)
+#   'predict' : attend la saisie des rôles dans /predictsetup ({'channels': list})
+_waiting_state: dict[int, tuple] = {}
+
+# /cancel : message d'annulation par type d'attente
+_CANCEL_MESSAGES = {
+    'channel': "❌ Saisie de canal annulée.",
+    'game': "❌ Analyse annulée.",
+    'perm': "❌ Saisie de permissions annulée.",
+    'helpcl': "❌ Sélection de canal annulée.",
+    'predict': "❌ Configuration de prédiction annulée.",
+}
+
+
+def _set_wait(uid: int, kind: str, state=True):
+    """Met l'utilisateur en attente d'une saisie de type `kind` (remplace toute autre attente)."""
+    _waiting_state[uid] = (kind, state)
+
+
+def _get_wait(uid: int, kind: str):
+    """État d'attente de type `kind` de l'utilisateur, ou None."""
+    entry = _waiting_state.get(uid)
+    return entry[1] if entry and entry[0] == kind else None
+
+
+def _pop_wait(uid: int, kind: str):
+    """Retire et retourne l'état d'attente de type `kind`, ou None."""
+    entry = _waiting_state.get(uid)
+    if entry and entry[0] == kind:
+        del _waiting_state[uid]
+        return entry[1]
+    return None
 
 
 def _clear_waits(uid: int):
     """Efface tous les états d'attente d'un utilisateur.
     Appelé automatiquement dès qu'une nouvelle commande est reçue,
     pour éviter qu'un ancien état bloque le nouveau flux."""
-    _waiting_for_channel.pop(uid, None)
-    _waiting_for_game.pop(uid, None)
-    _waiting_for_perm.pop(uid, None)
-    _waiting_for_helpcl.pop(uid, None)
-    _waiting_for_predict.pop(uid, None)
+    _waiting_state.pop(uid, None)
+
+@functools.lru_cache(maxsize=256)
+def _esc(s: str) -> str:
+    """Échappement HTML mémoïsé des noms de canaux (liste courte et stable)."""
+    return html.escape(str(s), quote=False)
+
+
+def _ch_name_html(ch: dict) -> str:
+    """Nom du canal déjà échappé (name_html enregistré par storage), sinon échappé ici."""
+    return ch.get('name_html') or _esc(ch.get('name') or ch['id'])
+
 
 def _build_channel_menu(channels: list) -> str:
     """Construit le menu numéroté des canaux pour /helpcl."""
     lines = ["📡 <b>CANAUX CONFIGURÉS</b>\n"]
     for i, ch in enumerate(channels, 1):
-        name = ch.get('name') or ch['id']
+        name = _ch_name_html(ch)
         cid = ch['id']
         date = ch.get('added_date', 'N/A')
         mark = " ▶️" if ch.get('active') else ""
@@ -181,18 +537,82 @@ def _build_channel_menu(channels: list) -> str:
     lines.append("Tapez <b>sortir</b> pour quitter sans changer")
     return '\n'.join(lines)
 
+# Commandes proposées à un sous-admin après /helpcl, dans cet ordre
+_HELPCL_SUGGESTED = ('sync', 'fullsync', 'gload', 'hsearch', 'gstats')
+
+# Marqueurs de canal indexés par bool(actif) : (inactif, actif)
+_MARKS = ("○", "▶️")
+
+
+def _fmt_channel_line(ch: dict) -> str:
+    """Ligne de canal pour les menus : marqueur actif/inactif + nom en gras."""
+    return f"  {_MARKS[bool(ch.get('active'))]} <b>{_ch_name_html(ch)}</b>"
+
+
+_CMD_LEN = len(ALL_COMMANDS)
+# Lignes "  n. commande" du récapitulatif de handle_perm_input
+_CMD_NUMBERED = [f"  {i}. {cmd}" for i, cmd in enumerate(ALL_COMMANDS, 1)]
+
+# Liste numérotée des commandes (statique) : seul l'en-tête dépend de l'admin ciblé
+_CMD_MENU_BODY = '\n'.join(
+    ["Choisissez les commandes autorisées :\n"]
+    + [f"  <b>{i}.</b> {cmd}" for i, cmd in enumerate(ALL_COMMANDS, 1)]
+    + ["\n✏️ Tapez les numéros séparés par des virgules",
+       "Ex : <code>1,3,4</code>  ou  <code>1-5,8,13</code>",
+       "\n/cancel pour annuler"]
+)
+
+
+def _pack_lines(lines: list, limit: int, sep: str = '\n') -> list:
+    """Regroupe des lignes (jointes par `sep`) en blocs d'au plus `limit` caractères."""
+    blocks, cur, size = [], [], 0
+    for line in lines:
+        if cur and size + len(line) + len(sep) > limit:
+            blocks.append(sep.join(cur))
+            cur, size = [], 0
+        cur.append(line)
+        size += len(line) + len(sep)
+    if cur:
+        blocks.append(sep.join(cur))
+    return blocks
+
+
+# Tables constantes de /gstructure et /gplusmoins
+_STRUCTURE_KEYS = ('2/2', '2/3', '3/2', '3/3')
+_PLUSMOINS_SIDE_MAP = {'j': 'plusmoins_j', 'joueur': 'plusmoins_j',
+                       'b': 'plusmoins_b', 'banquier': 'plusmoins_b'}
+_PLUSMOINS_CAT_MAP = {'plus': 'Plus de 6,5', 'moins': 'Moins de 4,5', 'neutre': 'Neutre'}
+_PLUSMOINS_ALL_SIDES = (('plusmoins_j', 'Joueur'), ('plusmoins_b', 'Banquier'))
+_PLUSMOINS_SIDE_LABEL = dict(_PLUSMOINS_ALL_SIDES)
+
+
+async def _reply_code_blocks(message, results: list, delay: int = 10):
+    """Envoie des blocs `format_ecarts` regroupés en messages de 3800 caractères au plus."""
+    fenced = [f"```\n{r}\n```\n" for r in results]
+    for chunk in _pack_lines(fenced, 3800):
+        sent = await _paced_send(message, chunk, parse_mode=ParseMode.MARKDOWN)
+        _schedule_delete(sent, delay=delay)
+
+
+# Bit de présence de chaque figure dans une main (A=1, K=2, Q=4, J=8)
+_FACE_BIT = {'A': 1, 'K': 2, 'Q': 4, 'J': 8}
+
+
+@functools.lru_cache(maxsize=64)
+def _face_mask(cards: tuple) -> int:
+    """Masque de bits des figures présentes (au plus 16 combinaisons distinctes)."""
+    m = 0
+    for c in cards:
+        m |= _FACE_BIT.get(c, 0)
+    return m
+
+
 def _build_cmd_menu(target_uid: int, action: str) -> str:
     """Construit le menu numéroté des commandes disponibles."""
     verb = "Ajouter" if action == 'add' else "Modifier les permissions de"
-    lines = [f"📋 <b>{verb} l'admin <code>{target_uid}</code></b>\n"]
-    lines.append("Choisissez les commandes autorisées :\n")
-    for i, cmd in enumerate(ALL_COMMANDS, 1):
-        lines.append(f"  <b>{i}.</b> {cmd}")
-    lines.append("\n✏️ Tapez les numéros séparés par des virgules")
-    lines.append("Ex : <code>1,3,4</code>  ou  <code>1-5,8,13</code>")
-    lines.append("\n/cancel pour annuler")
-    return '\n'.join(lines)
+    return f"📋 <b>{verb} l'admin <code>{target_uid}</code></b>\n\n{_CMD_MENU_BODY}"
 
+@functools.lru_cache(maxsize=2)
 def _main_menu_keyboard(is_main: bool = True) -> InlineKeyboardMarkup:
     """Clavier principal du bot organisé par section."""
     rows = [
@@ -318,19 +738,106 @@ _MENU_SECTIONS = {
     ),
 }
 
+# Clavier « retour » et charge utile (texte, clavier) de chaque section, construits une fois
+_BACK_KB = _back_keyboard()
+_SECTION_PAYLOAD = {k: (v, _BACK_KB) for k, v in _MENU_SECTIONS.items()}
+
+# Texte /help de l'administrateur principal (statique, construit une fois)
+_HELP_MAIN_TEXT = (
+    "📖 <b>AIDE — COMMANDES DU BOT VIP KOUAMÉ</b>\n\n"
+    + "\n\n".join((
+        "📋 <b>GÉNÉRAL</b>\n"
+        "  /start — Statut du bot et canaux actifs\n"
+        "  /help — Cette liste de commandes\n"
+        "  /documentation — Guide complet avec exemples\n"
+        "  /myid — Afficher votre Telegram ID\n"
+        "  /cancel — Annuler toute opération en cours",
+        "🔐 <b>CONNEXION TELEGRAM</b>\n"
+        "  /connect — Demander le code SMS d'authentification\n"
+        "  /code aa12345 — Valider le code reçu par SMS\n"
+        "  /disconnect — Supprimer la session active",
+        "💾 <b>DONNÉES LOCALES</b>\n"
+        "  /sync — Récupérer les messages récents du canal principal\n"
+        "  /fullsync — Récupérer tout l'historique du canal principal\n"
+        "  /stats — Statistiques des prédictions stockées\n"
+        "  /report — Générer un PDF de toutes les prédictions\n"
+        "  /search mot1 mot2 — Chercher et exporter en PDF\n"
+        "  /filter — Filtrer par couleur ou statut\n"
+        "  /clear — Effacer toutes les données locales\n"
+        "  📎 <i>Envoyer un fichier PDF → analyse automatique des numéros</i>",
+        "📡 <b>GESTION DES CANAUX</b>\n"
+        "  /helpcl — Sélectionner le canal actif (menu numéroté)\n"
+        "  /addchannel — Ajouter un nouveau canal à la liste\n"
+        "  /channels — Voir tous les canaux configurés\n"
+        "  /usechannel -100XXX — Activer un canal directement par ID\n"
+        "  /removechannel -100XXX — Supprimer un canal\n"
+        "  /hsearch mots-clés — Chercher dans l'historique du canal actif\n"
+        "    ↳ Options : <code>limit:500</code>  <code>from:2024-06-01</code>",
+        "📊 <b>ANALYSE BACCARAT</b>\n"
+        "  /gload <code>from:AAAA-MM-JJ</code> — Charger jeux à partir d'une date\n"
+        "  /gload <code>limit:N</code> — Charger les N derniers jeux\n"
+        "  /gstats — Statistiques des jeux chargés\n"
+        "  /ganalyze — Analyser un enregistrement (copier-coller)\n"
+        "  /gclear — Effacer les jeux analysés\n\n"
+        "  <b>Catégories :</b>\n"
+        "  /gvictoire joueur|banquier|nul — Écarts par résultat\n"
+        "  /gparite pair|impair — Écarts par parité du total\n"
+        "  /gstructure 2/2|2/3|3/2|3/3 — Structure des cartes\n"
+        "  /gplusmoins j|b plus|moins — Plus/Moins de 6,5 ou 4,5\n"
+        "  /gcostume ♠|♥|♦|♣ j|b — Costume manquant par main\n"
+        "  /gvaleur A|K|Q|J j|b — Valeurs spéciales par costume\n"
+        "  /gecartmax — Paires avec l'écart maximum (toutes catégories)",
+        "🔄 <b>CORRECTION DE CYCLES DE COSTUMES</b>\n"
+        "  /gcycle pair|impair [j|b] [N1-N2] — Tester un cycle prédéfini\n"
+        "  /gcycleauto [j|b] [N1-N2] — Trouver le meilleur cycle auto\n\n"
+        "  <i>Génère la liste complète numéro [costume] corrigé</i>",
+        "👥 <b>ADMINISTRATION</b>\n"
+        "  /addadmin USER_ID — Ajouter un admin (menu de sélection des commandes)\n"
+        "  /setperm USER_ID — Modifier les permissions d'un admin existant\n"
+        "  /removeadmin USER_ID — Supprimer un administrateur\n"
+        "  /admins — Voir la liste des admins et leurs permissions",
+    ))
+    + "\n\n💡 <i>/documentation pour des exemples détaillés · /cancel pour annuler</i>"
+)
+
+_HELP_SUB_TEMPLATE = (
+    "📖 <b>VOS COMMANDES AUTORISÉES</b>\n\n"
+    "{cmd_lines}\n\n"
+    "💡 Tapez /documentation pour voir les exemples d'utilisation.\n"
+    "<i>Vos accès sont gérés par l'administrateur principal.</i>"
+)
+
+
+def requires(command: str):
+    """Décorateur de handler : n'exécute la commande que si l'utilisateur y a accès."""
+    def deco(fn):
+        @functools.wraps(fn)
+        async def wrapper(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+            if not await self._perm(update, command):
+                return
+            return await fn(self, update, context)
+        return wrapper
+    return deco
+
 
 class Handlers:
     def __init__(self):
         self.syncing = False
+        # Analyse PDF (CPU) dans des processus séparés : la boucle d'événements reste libre.
+        # 'spawn' : un fork copierait des verrous tenus par d'autres threads (sauvegardes,
+        # Timer de la base, PTB) ; 2 processus suffisent pour des envois ponctuels.
+        self._pdf_pool = ProcessPoolExecutor(
+            max_workers=2, mp_context=multiprocessing.get_context('spawn')
+        )
 
     async def _perm(self, update: Update, command: str) -> bool:
         """Vérifie que l'utilisateur est admin ET a accès à cette commande."""
         uid = update.effective_user.id
+        if uid == ADMIN_ID:
+            return True
         if not is_admin(uid):
             return False
-        if is_main_admin(uid):
-            return True
-        if not has_permission(uid, command):
+        if command not in get_admin_permission_set(uid):
             await update.message.reply_text(f"❌ Vous n'avez pas accès à la commande /{command}.")
             return False
         return True
@@ -370,12 +877,7 @@ class Handlers:
         'searchcard':   'Rechercher les jeux par valeur de carte (A, K, Q, J)',
         'documentation':'Guide complet avec exemples d\'utilisation',
     }
-
-    def _back_keyboard(self):
-        """Bouton de retour au menu principal."""
-        return InlineKeyboardMarkup([
-            [InlineKeyboardButton("🔙 Menu principal", callback_data="menu:accueil")]
-        ])
+    _CMD_LINES = {c: f"  /{c} — {d}" for c, d in _CMD_DESC.items()}
 
     async def handle_menu_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Gestion des boutons inline du menu."""
@@ -396,44 +898,20 @@ class Handlers:
         # Vider les états d'attente lors de la navigation
         _clear_waits(uid)
 
-        if section == "recherche":
-            text = _MENU_SECTIONS["recherche"]
-            await query.edit_message_text(text, parse_mode='HTML', reply_markup=self._back_keyboard())
-            return
-        elif section == "prediction":
-            text = _MENU_SECTIONS["prediction"]
-            await query.edit_message_text(text, parse_mode='HTML', reply_markup=self._back_keyboard())
-            return
-        elif section == "analyse":
-            text = _MENU_SECTIONS["analyse"]
-            await query.edit_message_text(text, parse_mode='HTML', reply_markup=self._back_keyboard())
-            return
-        elif section == "cycles":
-            text = _MENU_SECTIONS["cycles"]
-            await query.edit_message_text(text, parse_mode='HTML', reply_markup=self._back_keyboard())
-            return
-        elif section == "canaux":
-            text = _MENU_SECTIONS["canaux"]
-            await query.edit_message_text(text, parse_mode='HTML', reply_markup=self._back_keyboard())
-            return
-        elif section == "doc":
-            text = _MENU_SECTIONS["doc"]
-            await query.edit_message_text(text, parse_mode='HTML', reply_markup=self._back_keyboard())
-            return
-        elif section == "admin":
+        if section == "admin":
             if not is_main_admin(uid):
                 await query.answer("❌ Réservé à l'administrateur principal.")
                 return
             await self.admin_menu(update, context)
             return
 
-        if section not in _MENU_SECTIONS:
+        payload = _SECTION_PAYLOAD.get(section)
+        if payload is None:
             await query.answer("Section inconnue.")
             return
 
-        text = _MENU_SECTIONS[section]
-        await query.edit_message_text(text, parse_mode='HTML',
-                                      reply_markup=self._back_keyboard())
+        text, kb = payload
+        await query.edit_message_text(text, parse_mode=ParseMode.HTML, reply_markup=kb)
 
     async def menu(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/menu — Affiche le menu principal avec les sections de commandes."""
@@ -442,18 +920,14 @@ class Handlers:
             return
         main = is_main_admin(uid)
         channels = get_channels()
-        ch_lines = []
-        for ch in channels:
-            mark = "▶️" if ch.get('active') else "○"
-            name = ch.get('name') or str(ch['id'])
-            ch_lines.append(f"  {mark} <b>{name}</b>")
+        ch_lines = list(map(_fmt_channel_line, channels))
         ch_block = ("\n".join(ch_lines)) if ch_lines else "  <i>Aucun canal — tapez /addchannel</i>"
         text = (
             "🎯 <b>Bot VIP KOUAMÉ &amp; JOKER</b>\n\n"
             f"📡 <b>Canaux :</b>\n{ch_block}\n\n"
             "Choisissez une section :"
         )
-        await update.message.reply_text(text, parse_mode='HTML',
+        await update.message.reply_text(text, parse_mode=ParseMode.HTML,
                                         reply_markup=_main_menu_keyboard(main))
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -471,22 +945,18 @@ class Handlers:
                     f"👋 Bonjour <b>{first_name}</b> !\n\n"
                     "❌ Aucune commande n'a encore été accordée à votre compte.\n\n"
                     "Contactez l'administrateur principal pour obtenir vos accès.",
-                    parse_mode='HTML'
+                    parse_mode=ParseMode.HTML
                 )
                 return
-            lines = []
-            for cmd in perms:
-                desc = self._CMD_DESC.get(cmd, '')
-                lines.append(f"  /{cmd} — {desc}" if desc else f"  /{cmd}")
-            cmds_text = '\n'.join(lines)
+            cmds_text = '\n'.join(self._CMD_LINES.get(c) or f"  /{c}" for c in perms)
             await update.message.reply_text(
                 f"👋 Bonjour <b>{first_name}</b> !\n\n"
                 "🎯 <b>Bot VIP KOUAMÉ &amp; JOKER</b>\n\n"
                 "📋 <b>Vos commandes :</b>\n\n"
                 f"{cmds_text}\n\n"
                 "💡 Tapez /documentation pour les exemples détaillés.",
-                parse_mode='HTML',
-                reply_markup=_main_menu_keyboard(is_main=False)
+                parse_mode=ParseMode.HTML,
+                reply_markup=_main_menu_keyboard(False)
             )
             return
 
@@ -495,18 +965,16 @@ class Handlers:
         if channels:
             ch_lines = []
             for ch in channels:
-                mark = "▶️" if ch.get('active') else "○"
-                name = ch.get('name') or str(ch['id'])
                 added = ch.get('added_at', '')
                 date_str = f" <i>({added[:10]})</i>" if added else ''
-                ch_lines.append(f"  {mark} <b>{name}</b> <code>{ch['id']}</code>{date_str}")
+                ch_lines.append(f"{_fmt_channel_line(ch)} <code>{ch['id']}</code>{date_str}")
             ch_block = "\n".join(ch_lines)
             await update.message.reply_text(
                 "🎯 <b>Bot VIP KOUAMÉ &amp; JOKER</b>\n\n"
                 f"📡 <b>Canaux configurés :</b>\n{ch_block}\n\n"
                 "Choisissez une section :",
-                parse_mode='HTML',
-                reply_markup=_main_menu_keyboard(is_main=True)
+                parse_mode=ParseMode.HTML,
+                reply_markup=_main_menu_keyboard(True)
             )
         else:
             await update.message.reply_text(
@@ -515,10 +983,10 @@ class Handlers:
                 "Pour commencer :\n"
                 "  /addchannel — Ajouter un canal Telegram\n\n"
                 "Ou envoyez directement l'ID du canal (ex : <code>-1001234567890</code>)",
-                parse_mode='HTML',
-                reply_markup=_main_menu_keyboard(is_main=True)
+                parse_mode=ParseMode.HTML,
+                reply_markup=_main_menu_keyboard(True)
             )
-            _waiting_for_channel[uid] = True
+            _set_wait(uid, 'channel')
     
     async def help_cmd(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/help — Liste toutes les commandes par domaine."""
@@ -526,111 +994,23 @@ class Handlers:
         if not is_admin(uid):
             return
 
-        main = is_main_admin(uid)
-
         # Pour un sous-admin : afficher uniquement ses commandes autorisées avec descriptions
-        if not main:
+        if not is_main_admin(uid):
             perms = get_admin_permissions(uid)
             if not perms:
                 await update.message.reply_text(
                     "❌ <b>Aucune commande accordée.</b>\n\n"
                     "Contactez l'administrateur principal pour obtenir des accès.",
-                    parse_mode='HTML'
+                    parse_mode=ParseMode.HTML
                 )
                 return
-            lines = []
-            for cmd in perms:
-                desc = self._CMD_DESC.get(cmd, '')
-                lines.append(f"  /{cmd} — {desc}" if desc else f"  /{cmd}")
-            cmd_lines = '\n'.join(lines)
+            cmd_lines = '\n'.join(self._CMD_LINES.get(c) or f"  /{c}" for c in perms)
             await update.message.reply_text(
-                f"📖 <b>VOS COMMANDES AUTORISÉES</b>\n\n"
-                f"{cmd_lines}\n\n"
-                f"💡 Tapez /documentation pour voir les exemples d'utilisation.\n"
-                f"<i>Vos accès sont gérés par l'administrateur principal.</i>",
-                parse_mode='HTML'
+                _HELP_SUB_TEMPLATE.format(cmd_lines=cmd_lines), parse_mode=ParseMode.HTML
             )
             return
 
-        sections = []
-
-        sections.append(
-            "📋 <b>GÉNÉRAL</b>\n"
-            "  /start — Statut du bot et canaux actifs\n"
-            "  /help — Cette liste de commandes\n"
-            "  /documentation — Guide complet avec exemples\n"
-            "  /myid — Afficher votre Telegram ID\n"
-            "  /cancel — Annuler toute opération en cours"
-        )
-
-        if main:
-            sections.append(
-                "🔐 <b>CONNEXION TELEGRAM</b>\n"
-                "  /connect — Demander le code SMS d'authentification\n"
-                "  /code aa12345 — Valider le code reçu par SMS\n"
-                "  /disconnect — Supprimer la session active"
-            )
-
-        sections.append(
-            "💾 <b>DONNÉES LOCALES</b>\n"
-            "  /sync — Récupérer les messages récents du canal principal\n"
-            "  /fullsync — Récupérer tout l'historique du canal principal\n"
-            "  /stats — Statistiques des prédictions stockées\n"
-            "  /report — Générer un PDF de toutes les prédictions\n"
-            "  /search mot1 mot2 — Chercher et exporter en PDF\n"
-            "  /filter — Filtrer par couleur ou statut\n"
-            "  /clear — Effacer toutes les données locales\n"
-            "  📎 <i>Envoyer un fichier PDF → analyse automatique des numéros</i>"
-        )
-
-        sections.append(
-            "📡 <b>GESTION DES CANAUX</b>\n"
-            "  /helpcl — Sélectionner le canal actif (menu numéroté)\n"
-            "  /addchannel — Ajouter un nouveau canal à la liste\n"
-            "  /channels — Voir tous les canaux configurés\n"
-            "  /usechannel -100XXX — Activer un canal directement par ID\n"
-            "  /removechannel -100XXX — Supprimer un canal\n"
-            "  /hsearch mots-clés — Chercher dans l'historique du canal actif\n"
-            "    ↳ Options : <code>limit:500</code>  <code>from:2024-06-01</code>"
-        )
-
-        sections.append(
-            "📊 <b>ANALYSE BACCARAT</b>\n"
-            "  /gload <code>from:AAAA-MM-JJ</code> — Charger jeux à partir d'une date\n"
-            "  /gload <code>limit:N</code> — Charger les N derniers jeux\n"
-            "  /gstats — Statistiques des jeux chargés\n"
-            "  /ganalyze — Analyser un enregistrement (copier-coller)\n"
-            "  /gclear — Effacer les jeux analysés\n\n"
-            "  <b>Catégories :</b>\n"
-            "  /gvictoire joueur|banquier|nul — Écarts par résultat\n"
-            "  /gparite pair|impair — Écarts par parité du total\n"
-            "  /gstructure 2/2|2/3|3/2|3/3 — Structure des cartes\n"
-            "  /gplusmoins j|b plus|moins — Plus/Moins de 6,5 ou 4,5\n"
-            "  /gcostume ♠|♥|♦|♣ j|b — Costume manquant par main\n"
-            "  /gvaleur A|K|Q|J j|b — Valeurs spéciales par costume\n"
-            "  /gecartmax — Paires avec l'écart maximum (toutes catégories)"
-        )
-
-        sections.append(
-            "🔄 <b>CORRECTION DE CYCLES DE COSTUMES</b>\n"
-            "  /gcycle pair|impair [j|b] [N1-N2] — Tester un cycle prédéfini\n"
-            "  /gcycleauto [j|b] [N1-N2] — Trouver le meilleur cycle auto\n\n"
-            "  <i>Génère la liste complète numéro [costume] corrigé</i>"
-        )
-
-        if main:
-            sections.append(
-                "👥 <b>ADMINISTRATION</b>\n"
-                "  /addadmin USER_ID — Ajouter un admin (menu de sélection des commandes)\n"
-                "  /setperm USER_ID — Modifier les permissions d'un admin existant\n"
-                "  /removeadmin USER_ID — Supprimer un administrateur\n"
-                "  /admins — Voir la liste des admins et leurs permissions"
-            )
-
-        header = "📖 <b>AIDE — COMMANDES DU BOT VIP KOUAMÉ</b>\n\n"
-        footer = "\n\n💡 <i>/documentation pour des exemples détaillés · /cancel pour annuler</i>"
-        full_text = header + "\n\n".join(sections) + footer
-        await update.message.reply_text(full_text, parse_mode='HTML')
+        await update.message.reply_text(_HELP_MAIN_TEXT, parse_mode=ParseMode.HTML)
 
     async def documentation(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/documentation — Génère et envoie un PDF complet de documentation."""
@@ -642,21 +1022,19 @@ class Handlers:
         msg = await update.message.reply_text("📚 Génération du guide PDF en cours…")
 
         try:
-            from pdf_generator import generate_documentation_pdf
             pdf_path = generate_documentation_pdf(is_main_admin=main)
 
-            await update.message.reply_document(
-                document=open(pdf_path, 'rb'),
-                filename="Documentation_VIP_Kouame.pdf",
-                caption="📚 <b>Documentation complète</b> — toutes les commandes avec exemples détaillés",
-                parse_mode='HTML'
-            )
+            with open(pdf_path, 'rb') as f:
+                await update.message.reply_document(
+                    document=f,
+                    filename="Documentation_VIP_Kouame.pdf",
+                    caption="📚 <b>Documentation complète</b> — toutes les commandes avec exemples détaillés",
+                    parse_mode=ParseMode.HTML
+                )
             await msg.delete()
-            import os
-            os.remove(pdf_path)
+            await asyncio.to_thread(_safe_unlink, pdf_path)
         except Exception as e:
-            import html as _html
-            await msg.edit_text(f"❌ Erreur lors de la génération : {_html.escape(str(e))}", parse_mode='HTML')
+            await msg.edit_text(f"❌ Erreur lors de la génération : {html.escape(str(e))}", parse_mode=ParseMode.HTML)
 
     async def connect(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/connect - Envoie le code SMS (supprime l'ancienne session si elle existe)"""
@@ -667,7 +1045,7 @@ class Handlers:
 
         try:
             success, result = await auth_manager.send_code()
-            await msg.edit_text(result, parse_mode='Markdown')
+            await msg.edit_text(result, parse_mode=ParseMode.MARKDOWN)
         except Exception as e:
             await msg.edit_text(f"❌ Erreur: {str(e)}")
     
@@ -679,7 +1057,7 @@ class Handlers:
         if not context.args:
             await update.message.reply_text(
                 "Usage: `/code aaXXXXXX`\nExemple: `/code aa43481`\n\nAjoutez `aa` avant les chiffres du code reçu.",
-                parse_mode='Markdown'
+                parse_mode=ParseMode.MARKDOWN
             )
             return
 
@@ -688,7 +1066,7 @@ class Handlers:
 
         try:
             success, result = await auth_manager.verify_code(code)
-            await msg.edit_text(result, parse_mode='Markdown')
+            await msg.edit_text(result, parse_mode=ParseMode.MARKDOWN)
         except Exception as e:
             await msg.edit_text(f"❌ Erreur: {str(e)}")
 
@@ -704,10 +1082,8 @@ class Handlers:
         except Exception as e:
             await msg.edit_text(f"❌ Erreur: {str(e)}")
     
+    @requires('sync')
     async def sync(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not await self._perm(update, 'sync'):
-            return
-
         if not auth_manager.is_connected():
             await update.message.reply_text("❌ Tapez /connect puis /code d'abord")
             return
@@ -717,23 +1093,21 @@ class Handlers:
             return
 
         self.syncing = True
-        msg = await update.message.reply_text("🔄 Synchronisation lancée en arrière-plan...")
+        msg = await update.message.reply_text("🔄 Synchronisation lancée en arrière-plan...",
+                                              disable_notification=True)
 
         async def _do_sync():
+            editor = ThrottledEditor(msg)
             try:
                 async def progress(n):
-                    if n % 500 == 0:
-                        try:
-                            await msg.edit_text(f"📥 {n} messages parcourus...")
-                        except Exception:
-                            pass
+                    editor.set_text(f"📥 {n} messages parcourus...")
 
                 result = await scraper.sync(full=False, progress_callback=progress)
-                await msg.edit_text(f"✅ **{result['new']}** nouvelles prédictions ajoutées !", parse_mode='Markdown')
+                await editor.flush(f"✅ **{result['new']}** nouvelles prédictions ajoutées !", parse_mode=ParseMode.MARKDOWN)
             except Exception as e:
                 logger.error(f"Sync error: {e}")
                 try:
-                    await msg.edit_text(f"❌ Erreur: {str(e)[:300]}")
+                    await editor.flush(f"❌ Erreur: {str(e)[:300]}")
                 except Exception:
                     pass
             finally:
@@ -741,10 +1115,8 @@ class Handlers:
 
         context.application.create_task(_do_sync())
 
+    @requires('fullsync')
     async def fullsync(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not await self._perm(update, 'fullsync'):
-            return
-
         if not auth_manager.is_connected():
             await update.message.reply_text("❌ Non connecté")
             return
@@ -756,24 +1128,22 @@ class Handlers:
         self.syncing = True
         msg = await update.message.reply_text(
             "🔄 Synchronisation complète lancée en arrière-plan...\n"
-            "Le bot reste utilisable. Vous recevrez un message à la fin."
+            "Le bot reste utilisable. Vous recevrez un message à la fin.",
+            disable_notification=True
         )
 
         async def _do_fullsync():
+            editor = ThrottledEditor(msg)
             try:
                 async def progress(n):
-                    if n % 1000 == 0 and n > 0:
-                        try:
-                            await msg.edit_text(f"📥 {n} messages parcourus en cours...")
-                        except Exception:
-                            pass
+                    editor.set_text(f"📥 {n} messages parcourus en cours...")
 
                 result = await scraper.sync(full=True, progress_callback=progress)
-                await msg.edit_text(f"✅ **{result['new']}** prédictions récupérées !", parse_mode='Markdown')
+                await editor.flush(f"✅ **{result['new']}** prédictions récupérées !", parse_mode=ParseMode.MARKDOWN)
             except Exception as e:
                 logger.error(f"Fullsync error: {e}")
                 try:
-                    await msg.edit_text(f"❌ Erreur: {str(e)[:300]}")
+                    await editor.flush(f"❌ Erreur: {str(e)[:300]}")
                 except Exception:
                     pass
             finally:
@@ -781,10 +1151,8 @@ class Handlers:
 
         context.application.create_task(_do_fullsync())
     
+    @requires('report')
     async def report(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not await self._perm(update, 'report'):
-            return
-        
         predictions = get_predictions(context.user_data.get('filters'))
         if not predictions:
             await update.message.reply_text("❌ Aucune donnée. Faites /fullsync d'abord")
@@ -794,24 +1162,22 @@ class Handlers:
         msg = await update.message.reply_text("📄 Génération PDF...")
         
         try:
-            pdf_path = generate_pdf(predictions, context.user_data.get('filters'))
-            
-            with open(pdf_path, 'rb') as f:
-                await context.bot.send_document(
-                    chat_id=requester_id,
-                    document=f,
-                    caption=f"✅ Rapport: {len(predictions)} prédictions"
-                )
-            
-            os.remove(pdf_path)
+            buf = io.BytesIO()
+            await asyncio.to_thread(generate_pdf, predictions, context.user_data.get('filters'), out=buf)
+            buf.seek(0)
+
+            await _send(lambda: context.bot.send_document(
+                chat_id=requester_id,
+                document=buf,
+                filename=f"rapport_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                caption=f"✅ Rapport: {len(predictions)} prédictions"
+            ))
             await msg.delete()
         except Exception as e:
             await msg.edit_text(f"❌ Erreur: {str(e)}")
     
+    @requires('filter')
     async def filter_cmd(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not await self._perm(update, 'filter'):
-            return
-        
         if not context.args:
             context.user_data['filters'] = {}
             await update.message.reply_text("✅ Filtres réinitialisés")
@@ -824,13 +1190,12 @@ class Handlers:
         context.user_data['filters'] = filters
         await update.message.reply_text(f"✅ Filtre: {filters}")
     
+    @requires('stats')
     async def stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not await self._perm(update, 'stats'):
-            return
-        
         s = get_stats()
         preds = get_predictions()
-        gagnes = sum(1 for p in preds if 'gagn' in p['statut'].lower())
+        # 'kind' posé à l'ingestion ; recalculé pour les anciens enregistrements
+        gagnes = sum(1 for p in preds if (p.get('kind') or status_kind(p['statut'])) == 'won')
         
         await update.message.reply_text(
             f"📊 Stats\n"
@@ -839,68 +1204,71 @@ class Handlers:
             f"• Taux: {round(gagnes/s['total']*100,1)}%" if s['total'] else "N/A"
         )
     
+    @requires('search')
     async def search(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/search <mots-clés> — Recherche dans les messages et génère un PDF"""
-        if not await self._perm(update, 'search'):
-            return
-
         if not context.args:
             await update.message.reply_text(
                 "Usage: `/search mot1 mot2 ...`\n"
                 "Ex: `/search rouge gagné`\n\n"
                 "Recherche tous les messages contenant tous ces mots.",
-                parse_mode='Markdown'
+                parse_mode=ParseMode.MARKDOWN
             )
             return
 
         keywords = list(context.args)
+        kw_str = ' '.join(keywords)
         bot = context.bot
         requester_id = update.effective_chat.id
         msg = await update.message.reply_text(
-            f"🔍 Recherche `{' '.join(keywords)}` lancée en arrière-plan...\n"
+            f"🔍 Recherche `{kw_str}` lancée en arrière-plan...\n"
             "Le bot reste utilisable. Vous recevrez le PDF à la fin.",
-            parse_mode='Markdown'
+            parse_mode=ParseMode.MARKDOWN,
+            disable_notification=True
         )
 
         async def _do_search():
             # 1. Recherche dans le canal Telegram si connecté
             if auth_manager.is_connected():
+                editor = ThrottledEditor(msg)
                 try:
                     async def progress(checked, found):
-                        if checked % 500 == 0:
-                            try:
-                                await msg.edit_text(f"🔍 {checked} messages vérifiés... ({found} trouvés)")
-                            except Exception:
-                                pass
+                        editor.set_text(f"🔍 {checked} messages vérifiés... ({found} trouvés)")
 
                     results = await scraper.search_in_channel(keywords, progress_callback=progress)
+                    await editor.flush()
 
-                    if results:
+                    inline = _format_search_inline(results, keywords, _fmt_channel_hit)
+                    if inline:
+                        await msg.edit_text(inline, parse_mode=ParseMode.HTML)
+                    elif results:
                         try:
                             await msg.edit_text(f"📄 {len(results)} résultat(s). Génération du PDF...")
                         except Exception:
                             pass
-                        pdf_path = generate_channel_search_pdf(results, keywords)
-                        with open(pdf_path, 'rb') as f:
-                            await bot.send_document(
-                                chat_id=requester_id,
-                                document=f,
-                                caption=f"🔍 Recherche: {' '.join(keywords)}\n✅ {len(results)} message(s) trouvé(s)"
-                            )
-                        os.remove(pdf_path)
+                        buf = io.BytesIO()
+                        await asyncio.to_thread(generate_channel_search_pdf, results, keywords, out=buf)
+                        buf.seek(0)
+                        await _send(lambda: bot.send_document(
+                            chat_id=requester_id,
+                            document=buf,
+                            filename=f"canal_recherche_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                            caption=f"🔍 Recherche: {kw_str}\n✅ {len(results)} message(s) trouvé(s)"
+                        ))
                         try:
                             await msg.delete()
                         except Exception:
                             pass
                     else:
                         await msg.edit_text(
-                            f"❌ Aucun message trouvé pour: `{' '.join(keywords)}`",
-                            parse_mode='Markdown'
+                            f"❌ Aucun message trouvé pour: `{kw_str}`",
+                            parse_mode=ParseMode.MARKDOWN
                         )
                     return
 
                 except Exception as e:
                     logger.error(f"Search canal error: {e}")
+                    await editor.flush()
                     try:
                         await msg.edit_text(f"⚠️ Erreur canal: {str(e)[:200]}\nRecherche dans les données locales...")
                     except Exception:
@@ -911,27 +1279,36 @@ class Handlers:
             if not results:
                 try:
                     await msg.edit_text(
-                        f"❌ Aucun résultat pour: `{' '.join(keywords)}`\n\n"
+                        f"❌ Aucun résultat pour: `{kw_str}`\n\n"
                         "Connectez-vous avec /connect + /code puis /fullsync pour accéder à l'historique complet.",
-                        parse_mode='Markdown'
+                        parse_mode=ParseMode.MARKDOWN
                     )
                 except Exception:
                     pass
                 return
 
+            inline = _format_search_inline(results, keywords, _fmt_local_hit)
+            if inline:
+                try:
+                    await msg.edit_text(inline, parse_mode=ParseMode.HTML)
+                except Exception:
+                    pass
+                return
+
             try:
                 await msg.edit_text(f"📄 {len(results)} résultat(s) local/locaux. Génération du PDF...")
             except Exception:
                 pass
             try:
-                pdf_path = generate_search_pdf(results, keywords)
-                with open(pdf_path, 'rb') as f:
-                    await bot.send_document(
-                        chat_id=requester_id,
-                        document=f,
-                        caption=f"🔍 Recherche: {' '.join(keywords)}\n✅ {len(results)} message(s) trouvé(s)"
-                    )
-                os.remove(pdf_path)
+                buf = io.BytesIO()
+                await asyncio.to_thread(generate_search_pdf, results, keywords, out=buf)
+                buf.seek(0)
+                await _send(lambda: bot.send_document(
+                    chat_id=requester_id,
+                    document=buf,
+                    filename=f"recherche_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf",
+                    caption=f"🔍 Recherche: {kw_str}\n✅ {len(results)} message(s) trouvé(s)"
+                ))
                 try:
                     await msg.delete()
                 except Exception:
@@ -944,14 +1321,9 @@ class Handlers:
 
         context.application.create_task(_do_search())
 
+    @requires('searchcard')
     async def searchcard(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/searchcard [A|K|Q|J] [joueur|banquier|tous] — Recherche par valeur de carte."""
-        if not await self._perm(update, 'searchcard'):
-            return
-
-        from game_analyzer import FACE_CARDS
-        from storage import get_analyzed_games
-
         USAGE = (
             "📋 <b>Usage de /searchcard</b>\n\n"
             "<code>/searchcard K</code> — Tous les jeux où K apparaît\n"
@@ -964,9 +1336,10 @@ class Handlers:
         )
 
         if not context.args:
-            await update.message.reply_text(USAGE, parse_mode='HTML')
+            await update.message.reply_text(USAGE, parse_mode=ParseMode.HTML)
             return
 
+        games_ver = analyzed_games_signature()  # avant la lecture : jamais plus récente que `games`
         games = get_analyzed_games()
         if not games:
             await update.message.reply_text(
@@ -976,7 +1349,7 @@ class Handlers:
 
         # Extraire les options de date + mots restants
         remaining_kw, _, from_date_sc, to_date_sc = parse_search_options(list(context.args))
-        games = _filter_games_by_date(games, from_date_sc, to_date_sc)
+        games = _filter_games_by_date(games, from_date_sc, to_date_sc, version=games_ver)
 
         # Parser les arguments : valeurs de cartes + côté optionnel
         args = [a.upper() for a in remaining_kw]
@@ -996,43 +1369,51 @@ class Handlers:
         if not valeurs:
             await update.message.reply_text(
                 "❌ Aucune valeur valide. Utilisez A, K, Q ou J.\n\n" + USAGE,
-                parse_mode='HTML'
+                parse_mode=ParseMode.HTML
             )
             return
 
-        # Recherche dans les jeux
+        # Recherche dans les jeux : un masque de bits par main, un seul ET par jeu
+        q = 0
+        for val in valeurs:
+            q |= _FACE_BIT[val]
+        use_j = side != 'banquier'
+        use_b = side != 'joueur'
         matching = []
+        max_num = 0  # dernier numéro connu, relevé dans la même passe
         for g in games:
-            face_j = g.get('face_j', set())
-            face_b = g.get('face_b', set())
-            found = False
-            for val in valeurs:
-                if side == 'joueur' and val in face_j:
-                    found = True
-                elif side == 'banquier' and val in face_b:
-                    found = True
-                elif side == 'tous' and (val in face_j or val in face_b):
-                    found = True
-            if found:
-                matching.append(g)
+            n = g['numero_int']
+            if n > max_num:
+                max_num = n
+            m = 0
+            if use_j:
+                m = _face_mask(tuple(g.get('face_j') or ()))
+            if use_b:
+                m |= _face_mask(tuple(g.get('face_b') or ()))
+            if m & q:
+                matching.append(n)
 
         if not matching:
             side_label = {'joueur': 'Joueur', 'banquier': 'Banquier', 'tous': 'Joueur ou Banquier'}[side]
             await update.message.reply_text(
                 f"❌ Aucun jeu trouvé avec <b>{'/ '.join(valeurs)}</b> côté <b>{side_label}</b>.",
-                parse_mode='HTML'
+                parse_mode=ParseMode.HTML
             )
             return
 
-        # Statistiques d'écart
-        nums = sorted(int(g['numero']) for g in matching)
+        # Statistiques d'écart en une passe : la somme des écarts vaut dernier - premier
+        nums = sorted(matching)
         total_games = len(games)
         pct = round(len(nums) / total_games * 100, 1)
-        ecarts = [nums[i+1] - nums[i] for i in range(len(nums)-1)] if len(nums) >= 2 else []
-        avg_ecart = round(sum(ecarts) / len(ecarts), 1) if ecarts else 0
-        max_ecart = max(ecarts) if ecarts else 0
+        max_ecart = 0
+        prev = nums[0]
+        for n in nums:
+            if n - prev > max_ecart:
+                max_ecart = n - prev
+            prev = n
+        avg_ecart = round((nums[-1] - nums[0]) / (len(nums) - 1), 1) if len(nums) >= 2 else 0
         last_num = nums[-1]
-        current_ecart = max(int(g['numero']) for g in games) - last_num
+        current_ecart = max_num - last_num
 
         side_label = {'joueur': '🃏 Joueur', 'banquier': '🏦 Banquier', 'tous': '🃏 Joueur + 🏦 Banquier'}[side]
         val_str = ' / '.join(valeurs)
@@ -1047,25 +1428,29 @@ class Handlers:
             f"⏱ Écart actuel depuis #N{last_num} : <b>{current_ecart}</b>\n"
         )
 
-        await update.message.reply_text(header, parse_mode='HTML')
+        await update.message.reply_text(header, parse_mode=ParseMode.HTML)
 
-        # Liste des numéros par bloc de 50 lignes max
+        # Liste des numéros en deux colonnes (par tranche de 50), regroupée en
+        # messages de ~3900 caractères ; au-delà de 4 messages, un seul fichier .txt
         lines = [f"#{n}" for n in nums]
         chunk_size = 50
+        rows = []
         for i in range(0, len(lines), chunk_size):
             chunk = lines[i:i + chunk_size]
-            col1 = chunk[:len(chunk)//2 + len(chunk)%2]
-            col2 = chunk[len(chunk)//2 + len(chunk)%2:]
-            rows = []
-            for a, b in zip(col1, col2):
-                rows.append(f"{a:<12}{b}")
-            if len(col1) > len(col2):
-                rows.append(f"{col1[-1]}")
-            block = '\n'.join(rows)
-            await update.message.reply_text(
-                f"<code>{block}</code>",
-                parse_mode='HTML'
+            half = sum(divmod(len(chunk), 2))
+            rows.extend(f"{a:<12}{b}".rstrip() for a, b in
+                        zip_longest(chunk[:half], chunk[half:], fillvalue=''))
+
+        blocks = _pack_lines(rows, 3900)
+        if len(blocks) > 4:
+            await update.message.reply_document(
+                document='\n'.join(rows).encode('utf-8'),
+                filename=f"searchcard_{''.join(valeurs)}_{side}.txt",
+                caption=f"🔍 {val_str} — {len(nums)} numéros"
             )
+            return
+        for block in blocks:
+            await _paced_send(update.message, f"<code>{block}</code>", parse_mode=ParseMode.HTML)
 
     async def handle_pdf(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Reçoit un PDF, l'analyse et renvoie la liste des numéros/costumes uniques."""
@@ -1076,25 +1461,28 @@ class Handlers:
         if not doc or doc.mime_type != 'application/pdf':
             return
 
-        msg = await update.message.reply_text("📥 PDF reçu. Analyse en cours...")
+        msg = await update.message.reply_text("📥 PDF reçu. Analyse en cours...",
+                                              disable_notification=True)
 
         async def _do_analyze():
-            tmp_path = f"/tmp/analyse_{doc.file_id}.pdf"
             try:
-                # Télécharger le PDF
+                # Télécharger le PDF en mémoire (pas de fichier temporaire)
                 file = await context.bot.get_file(doc.file_id)
-                await file.download_to_drive(tmp_path)
+                data = await file.download_as_bytearray()
 
                 await msg.edit_text("🔍 Extraction des données du PDF...")
 
-                results, raw_sample = analyze_pdf(tmp_path)
+                # Extraction pdfplumber dans le pool de processus (hors GIL de la boucle)
+                results, raw_sample = await asyncio.get_running_loop().run_in_executor(
+                    self._pdf_pool, analyze_pdf_bytes, bytes(data)
+                )
 
                 if not results:
                     await msg.edit_text(
                         "❌ Aucun numéro prédit trouvé dans ce PDF.\n\n"
                         "Assurez-vous que le PDF contient des prédictions au format:\n"
                         "`PRÉDICTION #X` et `Couleur: Y`",
-                        parse_mode='Markdown'
+                        parse_mode=ParseMode.MARKDOWN
                     )
                     return
 
@@ -1123,17 +1511,12 @@ class Handlers:
 
                 # Si trop long, envoyer en fichier texte
                 if len(response) > 4000:
-                    txt_path = f"/tmp/analyse_result_{doc.file_id}.txt"
-                    with open(txt_path, 'w', encoding='utf-8') as f:
-                        f.write(response)
-                    with open(txt_path, 'rb') as f:
-                        await context.bot.send_document(
-                            chat_id=update.effective_chat.id,
-                            document=f,
-                            caption=f"Joueur 😉😌 — {unique_count} numéros extraits",
-                            filename="predictions.txt"
-                        )
-                    os.remove(txt_path)
+                    await _send(lambda: context.bot.send_document(
+                        chat_id=update.effective_chat.id,
+                        document=response.encode('utf-8'),
+                        caption=f"Joueur 😉😌 — {unique_count} numéros extraits",
+                        filename="predictions.txt"
+                    ))
                     await msg.delete()
                 else:
                     await msg.edit_text(response)
@@ -1144,9 +1527,6 @@ class Handlers:
                     await msg.edit_text(f"❌ Erreur lors de l'analyse: {str(e)[:300]}")
                 except Exception:
                     pass
-            finally:
-                if os.path.exists(tmp_path):
-                    os.remove(tmp_path)
 
         context.application.create_task(_do_analyze())
 
@@ -1155,19 +1535,18 @@ class Handlers:
         if not is_main_admin(update.effective_user.id):
             await update.message.reply_text("❌ Réservé à l'administrateur principal.")
             return
-        _waiting_for_channel[update.effective_user.id] = True
+        _set_wait(update.effective_user.id, 'channel')
         await update.message.reply_text(
             "📡 Envoyez l'ID du canal à ajouter.\n\n"
             "Format attendu : `-1001234567890`\n"
             "Vous pouvez aussi envoyer le @username du canal public.\n\n"
             "_(Tapez /cancel pour annuler)_",
-            parse_mode='Markdown'
+            parse_mode=ParseMode.MARKDOWN
         )
 
+    @requires('channels')
     async def channels(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/channels — Liste les canaux et permet d'en choisir un."""
-        if not await self._perm(update, 'channels'):
-            return
         channels = get_channels()
         if not channels:
             await update.message.reply_text(
@@ -1178,58 +1557,54 @@ class Handlers:
         lines = ["📡 <b>Canaux de recherche enregistrés :</b>\n"]
         for ch in channels:
             mark = "▶️ <b>ACTIF</b>" if ch.get('active') else "⬜"
-            name = ch.get('name') or ch['id']
-            lines.append(f"{mark} {html.escape(str(name))} — <code>{ch['id']}</code>")
+            lines.append(f"{mark} {_ch_name_html(ch)} — <code>{ch['id']}</code>")
 
         lines.append("\n<b>Pour changer de canal actif :</b>")
         lines.append("<code>/usechannel ID</code>  ex: /usechannel -1001234567890")
         lines.append("<code>/removechannel ID</code>  pour supprimer")
 
-        await update.message.reply_text('\n'.join(lines), parse_mode='HTML')
+        await update.message.reply_text('\n'.join(lines), parse_mode=ParseMode.HTML)
 
+    @requires('usechannel')
     async def usechannel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/usechannel <id> — Définit le canal actif pour les recherches."""
-        if not await self._perm(update, 'usechannel'):
-            return
         if not context.args:
-            await update.message.reply_text("Usage: `/usechannel -1001234567890`", parse_mode='Markdown')
+            await update.message.reply_text("Usage: `/usechannel -1001234567890`", parse_mode=ParseMode.MARKDOWN)
             return
         channel_id = context.args[0].strip()
         channels = get_channels()
         if not any(ch['id'] == channel_id for ch in channels):
-            await update.message.reply_text(f"❌ Canal `{channel_id}` non trouvé. Tapez /channels pour voir la liste.", parse_mode='Markdown')
+            await update.message.reply_text(f"❌ Canal `{channel_id}` non trouvé. Tapez /channels pour voir la liste.", parse_mode=ParseMode.MARKDOWN)
             return
         set_active_channel(channel_id)
         active = get_active_channel()
-        name = active.get('name') or channel_id
         await update.message.reply_text(
-            f"✅ Canal actif : <b>{html.escape(str(name))}</b> (<code>{channel_id}</code>)",
-            parse_mode='HTML'
+            f"✅ Canal actif : <b>{_ch_name_html(active)}</b> (<code>{channel_id}</code>)",
+            parse_mode=ParseMode.HTML
         )
 
+    @requires('helpcl')
     async def helpcl(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/helpcl — Menu interactif de sélection du canal actif pour les analyses."""
-        if not await self._perm(update, 'helpcl'):
-            return
         channels = get_channels()
         if not channels:
             await update.message.reply_text(
                 "❌ Aucun canal configuré.\nUtilisez /addchannel pour en ajouter un."
             )
             return
-        _waiting_for_helpcl[update.effective_user.id] = True
-        await update.message.reply_text(_build_channel_menu(channels), parse_mode='HTML')
+        _set_wait(update.effective_user.id, 'helpcl')
+        await update.message.reply_text(_build_channel_menu(channels), parse_mode=ParseMode.HTML)
 
     async def handle_helpcl_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Reçoit le choix du canal dans le menu /helpcl."""
         uid = update.effective_user.id
-        if not _waiting_for_helpcl.get(uid):
+        if not _get_wait(uid, 'helpcl'):
             return
 
         text = update.message.text.strip().lower()
 
         if text in ('sortir', 'exit', 'quitter', '/cancel', 'cancel', 'annuler'):
-            _waiting_for_helpcl.pop(uid, None)
+            _pop_wait(uid, 'helpcl')
             await update.message.reply_text("↩️ Sélection annulée. Canal inchangé.")
             return
 
@@ -1238,15 +1613,15 @@ class Handlers:
             await update.message.reply_text(
                 f"❌ Tapez un numéro entre <b>1</b> et <b>{len(channels)}</b>, "
                 f"ou <b>sortir</b> pour annuler.",
-                parse_mode='HTML'
+                parse_mode=ParseMode.HTML
             )
             return
 
         idx = int(text) - 1
         chosen = channels[idx]
         set_active_channel(chosen['id'])
-        _waiting_for_helpcl.pop(uid, None)
-        name = chosen.get('name') or chosen['id']
+        _pop_wait(uid, 'helpcl')
+        name = _ch_name_html(chosen)
 
         # Proposer des commandes adaptées selon le profil
         if is_main_admin(uid):
@@ -1260,9 +1635,8 @@ class Handlers:
                 "  /help — Voir toutes les commandes"
             )
         else:
-            perms = get_admin_permissions(uid)
-            suggestions = [c for c in ('sync', 'fullsync', 'gload', 'hsearch', 'gstats') if c in perms]
-            lines = '\n'.join(f"  /{c} — {self._CMD_DESC.get(c, '')}" for c in suggestions)
+            perms = get_admin_permission_set(uid)
+            lines = '\n'.join(self._CMD_LINES[c] for c in _HELPCL_SUGGESTED if c in perms)
             next_cmds = (
                 f"📌 <b>Vos prochaines commandes :</b>\n\n{lines}"
                 if lines else "💡 Tapez /help pour voir vos commandes."
@@ -1270,12 +1644,12 @@ class Handlers:
 
         await update.message.reply_text(
             f"✅ <b>Canal actif sélectionné :</b>\n\n"
-            f"<b>{html.escape(name)}</b>\n"
+            f"<b>{name}</b>\n"
             f"<code>{chosen['id']}</code>\n\n"
             f"Toutes les analyses utiliseront ce canal.\n\n"
             f"━━━━━━━━━━━━━━━━━━━━\n"
             f"{next_cmds}",
-            parse_mode='HTML'
+            parse_mode=ParseMode.HTML
         )
 
     async def removechannel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -1284,11 +1658,11 @@ class Handlers:
             await update.message.reply_text("❌ Réservé à l'administrateur principal.")
             return
         if not context.args:
-            await update.message.reply_text("Usage: `/removechannel -1001234567890`", parse_mode='Markdown')
+            await update.message.reply_text("Usage: `/removechannel -1001234567890`", parse_mode=ParseMode.MARKDOWN)
             return
         channel_id = context.args[0].strip()
         remove_channel(channel_id)
-        await update.message.reply_text(f"🗑️ Canal `{channel_id}` supprimé.", parse_mode='Markdown')
+        await update.message.reply_text(f"🗑️ Canal `{channel_id}` supprimé.", parse_mode=ParseMode.MARKDOWN)
 
     async def cancel(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/cancel — Annule la recherche en cours et affiche les résultats partiels."""
@@ -1296,45 +1670,24 @@ class Handlers:
 
         # Annuler une recherche en cours
         if uid in _search_cancel:
-            _search_cancel[uid] = True
+            _search_cancel[uid].set()
             await update.message.reply_text(
                 "🛑 Annulation demandée...\n"
                 "⏳ Attends quelques secondes, les résultats partiels vont s'afficher."
             )
             return
 
-        # Annuler une saisie de canal en attente
-        if _waiting_for_channel.pop(uid, None):
-            await update.message.reply_text("❌ Saisie de canal annulée.")
-            return
-
-        # Annuler une saisie de jeu en attente
-        if _waiting_for_game.pop(uid, None):
-            await update.message.reply_text("❌ Analyse annulée.")
-            return
-
-        # Annuler une saisie de permissions en attente
-        if _waiting_for_perm.pop(uid, None):
-            await update.message.reply_text("❌ Saisie de permissions annulée.")
-            return
-
-        # Annuler le menu helpcl
-        if _waiting_for_helpcl.pop(uid, None):
-            await update.message.reply_text("❌ Sélection de canal annulée.")
-            return
-
-        # Annuler la configuration predict
-        if _waiting_for_predict.pop(uid, None):
-            await update.message.reply_text("❌ Configuration de prédiction annulée.")
+        # Annuler l'état d'attente en cours
+        kind, _ = _waiting_state.pop(uid, (None, None))
+        if kind in _CANCEL_MESSAGES:
+            await update.message.reply_text(_CANCEL_MESSAGES[kind])
             return
 
         await update.message.reply_text("ℹ️ Aucune opération en cours à annuler.")
 
+    @requires('hsearch')
     async def hsearch(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/hsearch mot1 mot2 [limit:N] [from:DATE] — Recherche dans l'historique du canal actif."""
-        if not await self._perm(update, 'hsearch'):
-            return
-
         active = get_active_channel()
         if not active:
             await update.message.reply_text(
@@ -1351,7 +1704,7 @@ class Handlers:
                 "`/hsearch GAGNÉ from:2026-02-20 10:00 to:2026-02-23 23:59`\n"
                 "`/hsearch GAGNÉ limit:500`\n\n"
                 "Tapez /cancel pour arrêter et voir les résultats partiels.",
-                parse_mode='Markdown'
+                parse_mode=ParseMode.MARKDOWN
             )
             return
 
@@ -1359,6 +1712,7 @@ class Handlers:
         if not keywords:
             await update.message.reply_text("❌ Aucun mot-clé fourni.")
             return
+        kw_str = ' '.join(keywords)
 
         uid = update.effective_user.id
         if uid in _search_cancel:
@@ -1369,36 +1723,24 @@ class Handlers:
         channel_name = active.get('name') or channel_id
         requester_id = update.effective_chat.id
 
-        scope_desc = ''
-        if limit:
-            scope_desc = f" | 🔢 {limit} derniers messages"
-        elif from_date and to_date:
-            scope_desc = f" | 📅 {from_date.strftime('%d/%m/%Y %H:%M')} → {to_date.strftime('%d/%m/%Y %H:%M')}"
-        elif from_date:
-            scope_desc = f" | 📅 depuis {from_date.strftime('%d/%m/%Y %H:%M')}"
-        elif to_date:
-            scope_desc = f" | 📅 jusqu'au {to_date.strftime('%d/%m/%Y %H:%M')}"
+        scope_desc = _format_scope(limit, from_date, to_date)
 
         msg = await update.message.reply_text(
-            f"🔍 Recherche `{' '.join(keywords)}` dans *{html.escape(str(channel_name))}*{scope_desc}\n"
+            f"🔍 Recherche `{kw_str}` dans *{html.escape(str(channel_name))}*{scope_desc}\n"
             f"⏳ Tapez /cancel pour arrêter et voir les résultats partiels.",
-            parse_mode='Markdown'
+            parse_mode=ParseMode.MARKDOWN
         )
 
-        _search_cancel[uid] = False
+        cancel_ev = _search_cancel[uid] = asyncio.Event()
 
         async def _do_hsearch():
+            editor = ThrottledEditor(msg, 1.2, parse_mode=ParseMode.MARKDOWN)
+            # Parties fixes du message de progression, calculées une seule fois
+            head = f"🔍 Recherche dans *{html.escape(str(channel_name))}*...\n📨 "
             try:
                 async def progress(checked, found):
-                    try:
-                        cancelled_hint = " | /cancel pour arrêter" if not _search_cancel.get(uid) else ""
-                        await msg.edit_text(
-                            f"🔍 Recherche dans *{html.escape(str(channel_name))}*...\n"
-                            f"📨 {checked} messages analysés — {found} trouvés{scope_desc}{cancelled_hint}",
-                            parse_mode='Markdown'
-                        )
-                    except Exception:
-                        pass
+                    tail = scope_desc + (" | /cancel pour arrêter" if not cancel_ev.is_set() else "")
+                    editor.set_text(f"{head}{checked} messages analysés — {found} trouvés{tail}")
 
                 results, title, was_cancelled = await scraper.search_in_any_channel(
                     channel_id, keywords,
@@ -1406,35 +1748,38 @@ class Handlers:
                     from_date=from_date,
                     to_date=to_date,
                     progress_callback=progress,
-                    cancel_check=lambda: _search_cancel.get(uid, False)
+                    cancel_check=cancel_ev.is_set
                 )
+                await editor.flush()
 
                 prefix = "🛑 Résultats partiels" if was_cancelled else "✅ Recherche terminée"
 
                 if not results:
                     status = "annulée, aucun résultat trouvé" if was_cancelled else "aucun résultat"
                     await msg.edit_text(
-                        f"🔍 Recherche {status} pour `{' '.join(keywords)}` dans *{html.escape(str(title))}*.",
-                        parse_mode='Markdown'
+                        f"🔍 Recherche {status} pour `{kw_str}` dans *{html.escape(str(title))}*.",
+                        parse_mode=ParseMode.MARKDOWN
                     )
                     return
 
-                pdf_path = generate_channel_search_pdf(results, keywords, title)
+                buf = io.BytesIO()
+                # ReportLab est du Python pur : génération hors de la boucle d'événements
+                await asyncio.to_thread(generate_channel_search_pdf, results, keywords, title, out=buf)
+                buf.seek(0)
                 tag = " (partiel)" if was_cancelled else ""
-                safe_caption = f"{prefix}{tag}: {' '.join(keywords)} | {len(results)} résultats | {title}"
-
-                with open(pdf_path, 'rb') as f:
-                    await context.bot.send_document(
-                        chat_id=requester_id,
-                        document=f,
-                        caption=safe_caption[:1024],
-                        filename=f"hsearch_{len(results)}.pdf"
-                    )
-                os.remove(pdf_path)
+                safe_caption = f"{prefix}{tag}: {kw_str} | {len(results)} résultats | {title}"
+
+                await _send(lambda: context.bot.send_document(
+                    chat_id=requester_id,
+                    document=buf,
+                    caption=safe_caption[:1024],
+                    filename=f"hsearch_{len(results)}.pdf"
+                ))
                 await msg.delete()
 
             except Exception as e:
                 logger.error(f"hsearch error: {e}")
+                await editor.flush()
                 try:
                     await msg.edit_text(f"❌ Erreur: {str(e)[:300]}")
                 except Exception:
@@ -1448,52 +1793,50 @@ class Handlers:
         """Reçoit un ID de canal quand le bot est en attente."""
         if not is_admin(update.effective_user.id):
             return
-        if not _waiting_for_channel.get(update.effective_user.id):
+        if not _get_wait(update.effective_user.id, 'channel'):
             return
 
         text = update.message.text.strip()
 
         # Annulation
         if text.lower() in ('/cancel', 'cancel', 'annuler'):
-            _waiting_for_channel.pop(update.effective_user.id, None)
+            _pop_wait(update.effective_user.id, 'channel')
             await update.message.reply_text("❌ Annulé.")
             return
 
         # Vérifier que c'est un ID valide ou un username
-        if not (text.lstrip('-').isdigit() or text.startswith('@') or text.startswith('https://t.me/')):
+        is_numeric = _NUMERIC_ID_RE.fullmatch(text) is not None
+        if not (is_numeric or text[:1] == '@' or text.startswith('https://t.me/')):
             await update.message.reply_text(
                 "❌ Format invalide. Envoyez un ID numérique (ex: `-1001234567890`) "
                 "ou un username (ex: `@moncanal`).\n\nOu tapez /cancel pour annuler.",
-                parse_mode='Markdown'
+                parse_mode=ParseMode.MARKDOWN
             )
             return
 
-        msg = await update.message.reply_text(f"🔄 Vérification du canal <code>{html.escape(text)}</code>...", parse_mode='HTML')
+        msg = await update.message.reply_text(f"🔄 Vérification du canal <code>{html.escape(text)}</code>...", parse_mode=ParseMode.HTML)
 
         async def _do_add():
             try:
                 # Tenter de résoudre le canal pour récupérer son nom
-                from scraper import scraper as _sc
-                _sc._make_client()
-                await _sc.client.connect()
+                from scraper import scraper as _sc, _client_lock
 
-                try:
-                    if text.lstrip('-').isdigit():
-                        cid = int(text)
-                    else:
-                        cid = text
+                if is_numeric:
+                    cid = int(text)
+                else:
+                    cid = text
 
-                    entity = await _sc.client.get_entity(cid)
-                    channel_name = entity.title if hasattr(entity, 'title') else text
-                    real_id = str(-1000000000000 - entity.id) if hasattr(entity, 'id') and not text.lstrip('-').isdigit() else text
-                    # Utiliser l'ID que l'utilisateur a fourni si c'est déjà numérique
-                    store_id = text if text.lstrip('-').isdigit() else str(entity.id)
+                # Client persistant : pas de connexion/déconnexion à chaque ajout
+                async with _client_lock:
+                    client = await _sc.ensure_connected()
+                    entity = await client.get_entity(cid)
 
-                finally:
-                    await _sc.client.disconnect()
+                channel_name = entity.title if hasattr(entity, 'title') else text
+                # Utiliser l'ID que l'utilisateur a fourni si c'est déjà numérique
+                store_id = text if is_numeric else str(entity.id)
 
                 added = add_channel(store_id, channel_name)
-                _waiting_for_channel.pop(update.effective_user.id, None)
+                _pop_wait(update.effective_user.id, 'channel')
 
                 if added:
                     channels = get_channels()
@@ -1502,39 +1845,37 @@ class Handlers:
                         f"✅ Canal ajouté : *{html.escape(channel_name)}*\n"
                         f"ID: `{store_id}`\n\n"
                         f"{'▶️ Ce canal est maintenant actif pour /hsearch' if is_first else 'Utilisez /usechannel pour le sélectionner.'}",
-                        parse_mode='Markdown'
+                        parse_mode=ParseMode.MARKDOWN
                     )
                 else:
-                    await msg.edit_text(f"⚠️ Ce canal est déjà dans la liste.", parse_mode='Markdown')
+                    await msg.edit_text(f"⚠️ Ce canal est déjà dans la liste.", parse_mode=ParseMode.MARKDOWN)
 
             except Exception as e:
-                _waiting_for_channel.pop(update.effective_user.id, None)
+                _pop_wait(update.effective_user.id, 'channel')
                 await msg.edit_text(
                     f"❌ Impossible d'accéder à ce canal : {str(e)[:200]}\n\n"
                     "Vérifiez que le compte Telegram est membre de ce canal.",
-                    parse_mode='Markdown'
+                    parse_mode=ParseMode.MARKDOWN
                 )
 
         context.application.create_task(_do_add())
 
     # ── COMMANDES ANALYSE DE JEUX ─────────────────────────────────────────────
 
+    @requires('ganalyze')
     async def ganalyze(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/ganalyze — Demande un enregistrement de jeu à analyser."""
-        if not await self._perm(update, 'ganalyze'):
-            return
-        _waiting_for_game[update.effective_user.id] = True
+        _set_wait(update.effective_user.id, 'game')
         await update.message.reply_text(
             "🎴 Envoyez un enregistrement de jeu à analyser.\n\n"
             "Exemple :\n`#N794. ✅3(K♦️4♦️9♦️) - 1(J♦️10♥️A♠️) #T4`\n\n"
             "_(Tapez /cancel pour annuler)_",
-            parse_mode='Markdown'
+            parse_mode=ParseMode.MARKDOWN
         )
 
+    @requires('gload')
     async def gload(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gload from:DATE [HH:MM] | limit:N — Charge et analyse les jeux du canal actif."""
-        if not await self._perm(update, 'gload'):
-            return
         active = get_active_channel()
         if not active:
             await update.message.reply_text("❌ Aucun canal actif. Tapez /addchannel.")
@@ -1556,68 +1897,64 @@ class Handlers:
                 "<code>/gload from:2026-02-20 to:2026-02-23</code>\n"
                 "<code>/gload from:2026-02-20 10:00 to:2026-02-23 23:59</code>\n"
                 "<code>/gload limit:500</code>",
-                parse_mode='HTML'
+                parse_mode=ParseMode.HTML
             )
             return
 
         channel_id = active['id']
         channel_name = active.get('name') or channel_id
 
-        scope_desc = ''
-        if limit:
-            scope_desc = f" | 🔢 {limit} derniers messages"
-        elif from_date and to_date:
-            scope_desc = f" | 📅 {from_date.strftime('%d/%m/%Y %H:%M')} → {to_date.strftime('%d/%m/%Y %H:%M')}"
-        elif from_date:
-            scope_desc = f" | 📅 depuis {from_date.strftime('%d/%m/%Y %H:%M')}"
-        elif to_date:
-            scope_desc = f" | 📅 jusqu'au {to_date.strftime('%d/%m/%Y %H:%M')}"
+        scope_desc = _format_scope(limit, from_date, to_date)
 
         msg = await update.message.reply_text(
             f"🔄 Chargement des jeux depuis *{html.escape(str(channel_name))}*{scope_desc}\n"
             f"⏳ Tapez /cancel pour arrêter et sauvegarder les jeux trouvés.",
-            parse_mode='Markdown'
+            parse_mode=ParseMode.MARKDOWN
         )
 
-        _search_cancel[uid] = False
+        cancel_ev = _search_cancel[uid] = asyncio.Event()
 
         async def _do_gload():
+            editor = ThrottledEditor(msg, 1.2, parse_mode=ParseMode.MARKDOWN)
+            # Parties fixes du message de progression, calculées une seule fois
+            head = f"🔄 Analyse *{html.escape(str(channel_name))}*...\n📨 "
+            tail = f"{scope_desc}\nTapez /cancel pour arrêter."
             try:
                 async def progress(checked, found):
-                    try:
-                        await msg.edit_text(
-                            f"🔄 Analyse *{html.escape(str(channel_name))}*...\n"
-                            f"📨 {checked} messages vus — {found} jeux trouvés{scope_desc}\n"
-                            f"Tapez /cancel pour arrêter.",
-                            parse_mode='Markdown'
-                        )
-                    except Exception:
-                        pass
+                    editor.set_text(f"{head}{checked} messages vus — {found} jeux trouvés{tail}")
 
-                records, title, was_cancelled = await scraper.get_game_records(
+                # Analyse au fil de l'eau : pas de liste intermédiaire d'enregistrements
+                info = {}
+                games = []
+                nb_records = 0
+                recs = scraper.iter_game_records(
                     channel_id,
                     limit=limit,
                     from_date=from_date,
                     to_date=to_date,
                     progress_callback=progress,
-                    cancel_check=lambda: _search_cancel.get(uid, False)
+                    cancel_check=cancel_ev.is_set,
+                    info=info
                 )
+                try:
+                    async for rec in recs:
+                        nb_records += 1
+                        g = parse_game(rec['text'])
+                        if g:
+                            if rec['date']:
+                                g['date'] = rec['date']
+                            games.append(g)
+                finally:
+                    await recs.aclose()
+                await editor.flush()
 
-                if not records:
+                if not nb_records:
                     await msg.edit_text("❌ Aucun enregistrement de jeu trouvé dans ce canal.")
                     return
 
-                games = []
-                for rec in records:
-                    text = rec['text'] if isinstance(rec, dict) else rec
-                    date_str = rec.get('date', '') if isinstance(rec, dict) else ''
-                    g = parse_game(text)
-                    if g:
-                        if date_str:
-                            g['date'] = date_str
-                        games.append(g)
-
-                save_analyzed_games(games)
+                title = info.get('title', str(channel_id))
+                was_cancelled = info.get('cancelled', False)
+                await asyncio.to_thread(save_analyzed_games, games)
                 prefix = "🛑 Chargement interrompu" if was_cancelled else "✅"
                 await msg.edit_text(
                     f"{prefix} *{len(games)} jeux analysés* depuis *{html.escape(title)}*{scope_desc}\n\n"
@@ -1629,10 +1966,11 @@ class Handlers:
                     f"/gplusmoins j|b plus|moins\n"
                     f"/gcostume ♠|♥|♦|♣ j|b\n"
                     f"/gecartmax",
-                    parse_mode='Markdown'
+                    parse_mode=ParseMode.MARKDOWN
                 )
             except Exception as e:
                 logger.error(f"gload error: {e}")
+                await editor.flush()
                 try:
                     await msg.edit_text(f"❌ Erreur: {str(e)[:300]}")
                 except Exception:
@@ -1653,7 +1991,7 @@ class Handlers:
             await update.message.reply_text(
                 "Usage : <code>/addadmin USER_ID</code>\n\n"
                 "L'utilisateur doit d'abord écrire au bot pour obtenir son ID via /myid.",
-                parse_mode='HTML'
+                parse_mode=ParseMode.HTML
             )
             return
         uid = int(context.args[0])
@@ -1664,12 +2002,12 @@ class Handlers:
             await update.message.reply_text(
                 f"⚠️ <code>{uid}</code> est déjà admin.\n"
                 f"Pour modifier ses permissions : /setperm {uid}",
-                parse_mode='HTML'
+                parse_mode=ParseMode.HTML
             )
             return
         # Afficher le menu numéroté et attendre la saisie
-        _waiting_for_perm[update.effective_user.id] = {'target_uid': uid, 'action': 'add'}
-        await update.message.reply_text(_build_cmd_menu(uid, 'add'), parse_mode='HTML')
+        _set_wait(update.effective_user.id, 'perm', {'target_uid': uid, 'action': 'add'})
+        await update.message.reply_text(_build_cmd_menu(uid, 'add'), parse_mode=ParseMode.HTML)
 
     async def removeadmin(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/removeadmin <user_id> — Supprime un administrateur."""
@@ -1677,7 +2015,7 @@ class Handlers:
             await update.message.reply_text("❌ Réservé à l'administrateur principal.")
             return
         if not context.args or not context.args[0].lstrip('-').isdigit():
-            await update.message.reply_text("Usage: `/removeadmin 123456789`", parse_mode='Markdown')
+            await update.message.reply_text("Usage: `/removeadmin 123456789`", parse_mode=ParseMode.MARKDOWN)
             return
         uid = int(context.args[0])
         if uid == ADMIN_ID:
@@ -1685,9 +2023,9 @@ class Handlers:
             return
         removed = remove_admin(uid)
         if removed:
-            await update.message.reply_text(f"🗑️ Admin supprimé : `{uid}`", parse_mode='Markdown')
+            await update.message.reply_text(f"🗑️ Admin supprimé : `{uid}`", parse_mode=ParseMode.MARKDOWN)
         else:
-            await update.message.reply_text(f"⚠️ `{uid}` n'est pas dans la liste.", parse_mode='Markdown')
+            await update.message.reply_text(f"⚠️ `{uid}` n'est pas dans la liste.", parse_mode=ParseMode.MARKDOWN)
 
     async def listadmins(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/admins — Liste les administrateurs avec leurs permissions."""
@@ -1705,7 +2043,7 @@ class Handlers:
         lines.append("\nAjout : `/addadmin USER_ID` → menu numéroté")
         lines.append("Modifier : `/setperm USER_ID` → menu numéroté")
         lines.append("Supprimer : `/removeadmin USER_ID`")
-        await update.message.reply_text('\n'.join(lines), parse_mode='Markdown')
+        await update.message.reply_text('\n'.join(lines), parse_mode=ParseMode.MARKDOWN)
 
     async def setperm(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/setperm <user_id> — Modifie les permissions d'un admin (menu de sélection)."""
@@ -1715,7 +2053,7 @@ class Handlers:
         if not context.args or not context.args[0].lstrip('-').isdigit():
             await update.message.reply_text(
                 "Usage : <code>/setperm USER_ID</code>",
-                parse_mode='HTML'
+                parse_mode=ParseMode.HTML
             )
             return
         uid = int(context.args[0])
@@ -1724,12 +2062,12 @@ class Handlers:
             return
         if uid not in get_admins():
             await update.message.reply_text(
-                f"⚠️ <code>{uid}</code> n'est pas admin.", parse_mode='HTML'
+                f"⚠️ <code>{uid}</code> n'est pas admin.", parse_mode=ParseMode.HTML
             )
             return
         # Afficher le menu numéroté et attendre la saisie
-        _waiting_for_perm[update.effective_user.id] = {'target_uid': uid, 'action': 'update'}
-        await update.message.reply_text(_build_cmd_menu(uid, 'update'), parse_mode='HTML')
+        _set_wait(update.effective_user.id, 'perm', {'target_uid': uid, 'action': 'update'})
+        await update.message.reply_text(_build_cmd_menu(uid, 'update'), parse_mode=ParseMode.HTML)
 
     async def myid(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/myid — Affiche votre Telegram user ID."""
@@ -1737,31 +2075,24 @@ class Handlers:
         name = update.effective_user.full_name or "Inconnu"
         await update.message.reply_text(
             f"👤 *{html.escape(name)}*\nVotre ID : `{uid}`",
-            parse_mode='Markdown'
+            parse_mode=ParseMode.MARKDOWN
         )
 
+    @requires('gstats')
     async def gstats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gstats — Bilan des écarts des jeux analysés."""
-        if not await self._perm(update, 'gstats'):
-            return
         games = get_analyzed_games()
         if not games:
             await update.message.reply_text("❌ Aucun jeu chargé. Tapez /gload d'abord.")
             return
 
-        from datetime import datetime as _dt
-        cats = build_category_stats(games)
-        heure = _dt.now().strftime('%H:%M')
+        cats = _get_cached_cats(games)
+        heure = datetime.now().strftime('%H:%M')
         nb = len(games)
 
         def _em(nums):
             """Retourne (total, écart_max) pour une liste de numéros."""
-            total = len(nums)
-            if total < 2:
-                return total, 0
-            sorted_nums = sorted(int(n) for n in nums)
-            ecarts = [sorted_nums[i+1] - sorted_nums[i] for i in range(len(sorted_nums)-1)]
-            return total, max(ecarts)
+            return len(nums), _max_ecart(nums)
 
         v = cats['victoire']
         p = cats['parite']
@@ -1771,6 +2102,13 @@ class Handlers:
             t, em = _em(nums)
             return f"{emoji} {label} : {t} | Écart max : {em}"
 
+        def line_sorted(emoji, label, arr):
+            return f"{emoji} {label} : {len(arr)} | Écart max : {_max_gap_sorted(arr)}"
+
+        # Structures triées une seule fois ; les bilans 2K/3K fusionnent deux
+        # listes déjà triées au lieu de concaténer puis retrier.
+        st = {k: sorted(map(int, s.get(k, []))) for k in ('2/2', '2/3', '3/2', '3/3')}
+
         lines = [
             "🌸 <b>BILAN DES ÉCARTS</b> 🌸",
             f"⏰ {heure} | 🎲 {nb} jeux",
@@ -1780,15 +2118,15 @@ class Handlers:
             line("⚖️", "Match Nul", v.get('NUL', [])),
             line("🔵", "Pair", p.get('PAIR', [])),
             line("🔴", "Impair", p.get('IMPAIR', [])),
-            line("🧡", "3/2", s.get('3/2', [])),
-            line("❤️", "3/3", s.get('3/3', [])),
-            line("🖤", "2/2", s.get('2/2', [])),
-            line("💚", "2/3", s.get('2/3', [])),
+            line_sorted("🧡", "3/2", st['3/2']),
+            line_sorted("❤️", "3/3", st['3/3']),
+            line_sorted("🖤", "2/2", st['2/2']),
+            line_sorted("💚", "2/3", st['2/3']),
             "",
-            line("👤", "Joueur 2K (2/2+2/3)", s.get('2/2', []) + s.get('2/3', [])),
-            line("👤", "Joueur 3K (3/2+3/3)", s.get('3/2', []) + s.get('3/3', [])),
-            line("🏦", "Banquier 2K (2/2+3/2)", s.get('2/2', []) + s.get('3/2', [])),
-            line("🏦", "Banquier 3K (2/3+3/3)", s.get('2/3', []) + s.get('3/3', [])),
+            line_sorted("👤", "Joueur 2K (2/2+2/3)", list(merge(st['2/2'], st['2/3']))),
+            line_sorted("👤", "Joueur 3K (3/2+3/3)", list(merge(st['3/2'], st['3/3']))),
+            line_sorted("🏦", "Banquier 2K (2/2+3/2)", list(merge(st['2/2'], st['3/2']))),
+            line_sorted("🏦", "Banquier 3K (2/3+3/3)", list(merge(st['2/3'], st['3/3']))),
             "",
             "🃏 <b>Cartes de Valeur</b>",
         ]
@@ -1813,92 +2151,90 @@ class Handlers:
                     row.append(f"{SUIT_EMOJI[suit]}:{em}")
                 lines.append(f"{side_e} {label} {side_l} — {' | '.join(row)}")
 
-        await update.message.reply_text('\n'.join(lines), parse_mode='HTML')
+        await _paced_send(update.message, '\n'.join(lines), parse_mode=ParseMode.HTML)
 
+    @requires('gvictoire')
     async def gvictoire(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gvictoire [joueur|banquier|nul] — Numéros et écarts par victoire."""
-        if not await self._perm(update, 'gvictoire'):
-            return
         games = get_analyzed_games()
         if not games:
             await update.message.reply_text("❌ Aucun jeu chargé. Tapez /gload d'abord.")
             return
 
-        from datetime import datetime as _dt
-        cats = build_category_stats(games)
+        cats = _get_cached_cats(games)
         arg = ' '.join(context.args).upper().strip() if context.args else ''
 
         victoire_cats = cats['victoire']
         keys_to_show = [arg] if arg in ('JOUEUR', 'BANQUIER', 'NUL') else list(victoire_cats.keys())
+        keys_to_show = [k for k in keys_to_show if victoire_cats.get(k)]
+        if not keys_to_show:
+            await update.message.reply_text("ℹ️ Aucun résultat.")
+            return
 
-        for k in keys_to_show:
-            nums = victoire_cats[k]
-            result = format_ecarts(nums, f"🏆 Victoire {k}")
-            sent = await update.message.reply_text(f"```\n{result}\n```", parse_mode='Markdown')
-            _schedule_delete(sent, delay=10)
+        await _reply_code_blocks(update.message, [
+            format_ecarts(victoire_cats[k], f"🏆 Victoire {k}") for k in keys_to_show
+        ])
 
-        heure = _dt.now().strftime('%H:%M')
+        heure = datetime.now().strftime('%H:%M')
         nb = len(games)
         bilan_lines = [f"🌸 <b>BILAN DES VICTOIRES</b> 🌸", f"⏰ {heure} | 🎲 {nb} jeux\n"]
         for k in keys_to_show:
             em = _max_ecart(victoire_cats[k])
             bilan_lines.append(f"🏆 Écart max {k.capitalize()} : {em}")
-        await update.message.reply_text('\n'.join(bilan_lines), parse_mode='HTML')
+        await _paced_send(update.message, '\n'.join(bilan_lines), parse_mode=ParseMode.HTML)
 
+    @requires('gparite')
     async def gparite(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gparite [pair|impair] — Numéros et écarts par parité."""
-        if not await self._perm(update, 'gparite'):
-            return
         games = get_analyzed_games()
         if not games:
             await update.message.reply_text("❌ Aucun jeu chargé. Tapez /gload d'abord.")
             return
 
-        from datetime import datetime as _dt
-        cats = build_category_stats(games)
+        cats = _get_cached_cats(games)
         arg = ' '.join(context.args).upper().strip() if context.args else ''
 
         parite_cats = cats['parite']
         keys_to_show = [arg] if arg in ('PAIR', 'IMPAIR') else list(parite_cats.keys())
+        keys_to_show = [k for k in keys_to_show if parite_cats.get(k)]
+        if not keys_to_show:
+            await update.message.reply_text("ℹ️ Aucun résultat.")
+            return
 
-        for k in keys_to_show:
-            nums = parite_cats[k]
-            result = format_ecarts(nums, f"📊 {k}")
-            sent = await update.message.reply_text(f"```\n{result}\n```", parse_mode='Markdown')
-            _schedule_delete(sent, delay=10)
+        await _reply_code_blocks(update.message, [
+            format_ecarts(parite_cats[k], f"📊 {k}") for k in keys_to_show
+        ])
 
-        heure = _dt.now().strftime('%H:%M')
+        heure = datetime.now().strftime('%H:%M')
         nb = len(games)
         bilan_lines = [f"🌸 <b>BILAN DE PARITÉ</b> 🌸", f"⏰ {heure} | 🎲 {nb} jeux\n"]
         for k in keys_to_show:
             em = _max_ecart(parite_cats[k])
             bilan_lines.append(f"📊 Écart max {k.capitalize()} : {em}")
-        await update.message.reply_text('\n'.join(bilan_lines), parse_mode='HTML')
+        await _paced_send(update.message, '\n'.join(bilan_lines), parse_mode=ParseMode.HTML)
 
+    @requires('gstructure')
     async def gstructure(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gstructure [2/2|2/3|3/2|3/3] — Numéros et écarts par structure de cartes."""
-        if not await self._perm(update, 'gstructure'):
-            return
         games = get_analyzed_games()
         if not games:
             await update.message.reply_text("❌ Aucun jeu chargé. Tapez /gload d'abord.")
             return
 
-        from datetime import datetime as _dt
-        cats = build_category_stats(games)
+        cats = _get_cached_cats(games)
         arg = ' '.join(context.args).strip() if context.args else ''
 
-        valid = ['2/2', '2/3', '3/2', '3/3']
-        keys_to_show = [arg] if arg in valid else valid
+        keys_to_show = [k for k in ((arg,) if arg in _STRUCTURE_KEYS else _STRUCTURE_KEYS)
+                        if cats['structure'][k]]
+        if not keys_to_show:
+            await update.message.reply_text("ℹ️ Aucun résultat.")
+            return
 
-        for k in keys_to_show:
-            nums = cats['structure'][k]
-            if nums:
-                result = format_ecarts(nums, f"🎴 Structure {k}")
-                sent = await update.message.reply_text(f"```\n{result}\n```", parse_mode='Markdown')
-                _schedule_delete(sent, delay=10)
+        await _reply_code_blocks(update.message, [
+            format_ecarts(cats['structure'][k], f"🎴 Structure {k}") for k in keys_to_show
+        ])
 
-        heure = _dt.now().strftime('%H:%M')
+        heure = datetime.now().strftime('%H:%M')
         nb = len(games)
         bilan_lines = [f"🌸 <b>BILAN DES STRUCTURES</b> 🌸", f"⏰ {heure} | 🎲 {nb} jeux\n"]
         for k in keys_to_show:
@@ -1915,63 +2251,60 @@ class Handlers:
             bilan_lines.append(f"  2K (2 cartes) : {len(bk2)} jeux | Écart max : {_max_ecart(bk2)}")
             bilan_lines.append(f"  3K (3 cartes) : {len(bk3)} jeux | Écart max : {_max_ecart(bk3)}")
 
-        await update.message.reply_text('\n'.join(bilan_lines), parse_mode='HTML')
+        await _paced_send(update.message, '\n'.join(bilan_lines), parse_mode=ParseMode.HTML)
 
+    @requires('gplusmoins')
     async def gplusmoins(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gplusmoins [j|b] [plus|moins] — Numéros et écarts par Plus/Moins."""
-        if not await self._perm(update, 'gplusmoins'):
-            return
         games = get_analyzed_games()
         if not games:
             await update.message.reply_text("❌ Aucun jeu chargé. Tapez /gload d'abord.")
             return
 
-        from datetime import datetime as _dt
-        cats = build_category_stats(games)
+        cats = _get_cached_cats(games)
         args = [a.lower() for a in context.args] if context.args else []
 
-        side_map = {'j': 'plusmoins_j', 'joueur': 'plusmoins_j',
-                    'b': 'plusmoins_b', 'banquier': 'plusmoins_b'}
-        cat_map = {'plus': 'Plus de 6,5', 'moins': 'Moins de 4,5', 'neutre': 'Neutre'}
+        side_key = _PLUSMOINS_SIDE_MAP.get(args[0]) if args else None
+        cat_key = _PLUSMOINS_CAT_MAP.get(args[1]) if len(args) > 1 else None
 
-        side_key = side_map.get(args[0]) if args else None
-        cat_key = cat_map.get(args[1]) if len(args) > 1 else None
-
-        all_sides = [('plusmoins_j', 'Joueur'), ('plusmoins_b', 'Banquier')]
-        sides_to_show = [(side_key, side_key.split('_')[1].capitalize())] if side_key else all_sides
+        sides_to_show = ((side_key, _PLUSMOINS_SIDE_LABEL[side_key]),) if side_key else _PLUSMOINS_ALL_SIDES
 
+        # Catégories non vides seulement, par côté
+        sections = []
         for side_k, side_label in sides_to_show:
             cats_to_show = {cat_key: cats[side_k][cat_key]} if cat_key else cats[side_k]
-            for cat_label, nums in cats_to_show.items():
-                if nums:
-                    label = f"🎯 {side_label} — {cat_label}"
-                    result = format_ecarts(nums, label)
-                    sent = await update.message.reply_text(f"```\n{result}\n```", parse_mode='Markdown')
-                    _schedule_delete(sent, delay=10)
-
-        heure = _dt.now().strftime('%H:%M')
+            non_empty = {c: nums for c, nums in cats_to_show.items() if nums}
+            if non_empty:
+                sections.append((side_k, side_label, non_empty))
+        if not sections:
+            await update.message.reply_text("ℹ️ Aucun résultat.")
+            return
+
+        await _reply_code_blocks(update.message, [
+            format_ecarts(nums, f"🎯 {side_label} — {cat_label}")
+            for _, side_label, non_empty in sections
+            for cat_label, nums in non_empty.items()
+        ])
+
+        heure = datetime.now().strftime('%H:%M')
         nb = len(games)
         bilan_lines = [f"🌸 <b>BILAN PLUS/MOINS</b> 🌸", f"⏰ {heure} | 🎲 {nb} jeux\n"]
-        for side_k, side_label in sides_to_show:
-            cats_to_show = {cat_key: cats[side_k][cat_key]} if cat_key else cats[side_k]
+        for side_k, side_label, non_empty in sections:
             bilan_lines.append(f"<b>{'👤' if 'j' in side_k else '🏦'} {side_label} :</b>")
-            for cat_label, nums in cats_to_show.items():
+            for cat_label, nums in non_empty.items():
                 em = _max_ecart(nums)
                 bilan_lines.append(f"  Écart max {cat_label} : {em}")
-        await update.message.reply_text('\n'.join(bilan_lines), parse_mode='HTML')
+        await _paced_send(update.message, '\n'.join(bilan_lines), parse_mode=ParseMode.HTML)
 
+    @requires('gcostume')
     async def gcostume(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gcostume [♠|♥|♦|♣] [j|b] — Costumes manquants avec écarts."""
-        if not await self._perm(update, 'gcostume'):
-            return
         games = get_analyzed_games()
         if not games:
             await update.message.reply_text("❌ Aucun jeu chargé. Tapez /gload d'abord.")
             return
 
-        from datetime import datetime as _dt
-
-        cats = build_category_stats(games)
+        cats = _get_cached_cats(games)
         args = context.args if context.args else []
 
         suit_arg = normalize_suit(args[0]) if args else None
@@ -1981,11 +2314,12 @@ class Handlers:
         side_key = side_map.get(side_arg) if side_arg else None
 
         def _bilan(suit):
-            heure = _dt.now().strftime('%H:%M')
+            heure = datetime.now().strftime('%H:%M')
             nb = len(games)
             emoji = SUIT_EMOJI[suit]
-            em_j = _max_ecart(cats['missing_j'][suit])
-            em_b = _max_ecart(cats['missing_b'][suit])
+            # Écarts max mémorisés (partagés avec /gecartmax) : pas de retri
+            em_j = _cached_max_pair(cats, 'missing_j', suit)[1]
+            em_b = _cached_max_pair(cats, 'missing_b', suit)[1]
             return (
                 f"🌸 <b>BILAN DES ÉCARTS {emoji}</b> 🌸\n"
                 f"⏰ {heure} | 🎲 {nb} jeux\n\n"
@@ -1995,32 +2329,27 @@ class Handlers:
 
         suits_to_show = [suit_arg] if suit_arg else ['♠', '♥', '♦', '♣']
 
+        all_sides = (('missing_j', 'Joueur'), ('missing_b', 'Banquier'))
+        sides = [(side_key, dict(all_sides)[side_key])] if side_key else all_sides
+
         for suit in suits_to_show:
-            sides = [(side_key, side_key.split('_')[1].capitalize())] if side_key else [
-                ('missing_j', 'Joueur'), ('missing_b', 'Banquier')
-            ]
-            for sk, sl in sides:
-                nums = cats[sk][suit]
-                label = f"{SUIT_EMOJI[suit]} Manquant {sl}"
-                result = format_ecarts(nums, label)
-                sent = await update.message.reply_text(f"```\n{result}\n```", parse_mode='Markdown')
-                _schedule_delete(sent, delay=10)
+            # Blocs Joueur/Banquier du costume regroupés dans un seul message
+            await _reply_code_blocks(update.message, [
+                format_ecarts(cats[sk][suit], f"{SUIT_EMOJI[suit]} Manquant {sl}") for sk, sl in sides
+            ])
 
             # Message bilan compact séparé — conservé indéfiniment
-            await update.message.reply_text(_bilan(suit), parse_mode='HTML')
+            await _paced_send(update.message, _bilan(suit), parse_mode=ParseMode.HTML)
 
+    @requires('gvaleur')
     async def gvaleur(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gvaleur [A|K|Q|J] [j|b] — Valeurs spéciales par costume avec écarts."""
-        if not await self._perm(update, 'gvaleur'):
-            return
         games = get_analyzed_games()
         if not games:
             await update.message.reply_text("❌ Aucun jeu chargé. Tapez /gload d'abord.")
             return
 
-        from datetime import datetime as _dt
-
-        cats = build_category_stats(games)
+        cats = _get_cached_cats(games)
         args = [a.upper() if a.upper() in ('A', 'K', 'Q', 'J') else a.lower() for a in (context.args or [])]
 
         face_arg = None
@@ -2047,10 +2376,10 @@ class Handlers:
                     if nums:
                         label = f"🃏 {face_labels[fc]}{SUIT_EMOJI[suit]} {sl}"
                         result = format_ecarts(nums, label)
-                        sent = await update.message.reply_text(f"```\n{result}\n```", parse_mode='Markdown')
+                        sent = await update.message.reply_text(f"```\n{result}\n```", parse_mode=ParseMode.MARKDOWN)
                         _schedule_delete(sent, delay=10)
 
-        heure = _dt.now().strftime('%H:%M')
+        heure = datetime.now().strftime('%H:%M')
         nb = len(games)
         bilan_lines = [f"🌸 <b>BILAN DES VALEURS SPÉCIALES</b> 🌸", f"⏰ {heure} | 🎲 {nb} jeux\n"]
         for fc in faces_to_show:
@@ -2064,18 +2393,16 @@ class Handlers:
                     em = _max_ecart(nums)
                     cnt = len(nums)
                     bilan_lines.append(f"    {SUIT_EMOJI[suit]} Écart max : <b>{em}</b>  ({cnt} apparitions)")
-        await update.message.reply_text('\n'.join(bilan_lines), parse_mode='HTML')
+        await _paced_send(update.message, '\n'.join(bilan_lines), parse_mode=ParseMode.HTML)
 
+    @requires('gcycle')
     async def gcycle(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gcycle pair|impair [j|b] [N1-N2] — Analyse du cycle de costumes manquants."""
-        if not await self._perm(update, 'gcycle'):
-            return
         games = get_analyzed_games()
         if not games:
             await update.message.reply_text("❌ Aucun jeu chargé. Tapez /gload d'abord.")
             return
 
-        from datetime import datetime as _dt
         from itertools import product as _product
 
         CYCLE_PAIR = ['♥', '♦', '♣', '♠', '♦', '♥', '♠']
@@ -2124,7 +2451,7 @@ class Handlers:
                 "  Cycle : ❤️♦️♣️♠️♦️❤️♠️♣️ (8 éléments)\n\n"
                 "Options : <code>j</code>/<code>b</code> (côté) · <code>6-1436</code> (plage)\n"
                 "Ex : <code>/gcycle pair j 6-1436</code>",
-                parse_mode='HTML'
+                parse_mode=ParseMode.HTML
             )
             return
 
@@ -2230,7 +2557,7 @@ class Handlers:
                     'length': len(best_c),
                 })
 
-        heure = _dt.now().strftime('%H:%M')
+        heure = datetime.now().strftime('%H:%M')
         cycle_str = ''.join(cycle_display)
 
         for r in all_results:
@@ -2244,7 +2571,7 @@ class Handlers:
                 )
                 if len(detail_text) > 4000:
                     detail_text = detail_text[:3950] + "\n... (tronqué)"
-                sent = await update.message.reply_text(detail_text, parse_mode='HTML')
+                sent = await update.message.reply_text(detail_text, parse_mode=ParseMode.HTML)
                 _schedule_delete(sent, delay=15)
 
         bilan_lines = [
@@ -2275,7 +2602,7 @@ class Handlers:
                     bilan_lines.append(f"  📈 Amélioration : +{improvement:.1f}%")
                 bilan_lines.append("")
 
-        await update.message.reply_text('\n'.join(bilan_lines), parse_mode='HTML')
+        await _paced_send(update.message, '\n'.join(bilan_lines), parse_mode=ParseMode.HTML)
 
         for sc in suggested_cycles:
             sk = 'missing_j' if 'Joueur' in sc['side'] else 'missing_b'
@@ -2288,32 +2615,28 @@ class Handlers:
                 corr_lines.append(f"{n} [{emoji}]")
             corr_text = '\n'.join(corr_lines)
             if len(corr_text) > 4000:
-                import tempfile, os as _os
                 txt_path = f"/tmp/correction_{sc['side']}_{mode_label}.txt"
                 with open(txt_path, 'w', encoding='utf-8') as fout:
                     fout.write(corr_text)
                 with open(txt_path, 'rb') as fin:
-                    await context.bot.send_document(
+                    await _send(lambda: context.bot.send_document(
                         chat_id=update.effective_chat.id,
                         document=fin,
                         caption=f"📋 Correction {sc['side_emoji']} {sc['side']} — {sc['display']}",
                         filename=f"correction_{sc['side'].lower()}_{mode_label.lower()}.txt"
-                    )
-                _os.remove(txt_path)
+                    ))
+                await asyncio.to_thread(_safe_unlink, txt_path)
             else:
                 await update.message.reply_text(corr_text)
 
+    @requires('gcycleauto')
     async def gcycleauto(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gcycleauto [j|b] [N1-N2] — Recherche auto du meilleur cycle + filtre de numéros."""
-        if not await self._perm(update, 'gcycleauto'):
-            return
         games = get_analyzed_games()
         if not games:
             await update.message.reply_text("❌ Aucun jeu chargé. Tapez /gload d'abord.")
             return
 
-        from datetime import datetime as _dt
-
         SUIT_TO_EMOJI = {'♠': '♠️', '♥': '❤️', '♦': '♦️', '♣': '♣️'}
         SUITS = ['♠', '♥', '♦', '♣']
 
@@ -2340,7 +2663,7 @@ class Handlers:
         msg = await update.message.reply_text(
             "🔬 <b>Recherche du meilleur cycle en cours…</b>\n"
             "Analyse de toutes les combinaisons de filtres et longueurs.",
-            parse_mode='HTML'
+            parse_mode=ParseMode.HTML
         )
 
         game_map = {int(g['numero']): g for g in games}
@@ -2441,7 +2764,7 @@ class Handlers:
 
         top_results.sort(key=lambda x: -x['pct'])
 
-        heure = _dt.now().strftime('%H:%M')
+        heure = datetime.now().strftime('%H:%M')
         bilan_lines = [
             f"🔬 <b>RECHERCHE AUTOMATIQUE DU MEILLEUR CYCLE</b>",
             f"⏰ {heure} | 🎲 Jeux #{from_num}→#{to_num}",
@@ -2500,14 +2823,14 @@ class Handlers:
                 )
                 if len(detail_text) > 4000:
                     detail_text = detail_text[:3950] + "\n... (tronqué)"
-                sent = await update.message.reply_text(detail_text, parse_mode='HTML')
+                sent = await update.message.reply_text(detail_text, parse_mode=ParseMode.HTML)
                 _schedule_delete(sent, delay=20)
 
         try:
             await msg.delete()
         except Exception:
             pass
-        await update.message.reply_text('\n'.join(bilan_lines), parse_mode='HTML')
+        await _paced_send(update.message, '\n'.join(bilan_lines), parse_mode=ParseMode.HTML)
 
         if best:
             corr_cycle = best['cycle']
@@ -2520,145 +2843,89 @@ class Handlers:
                 corr_lines.append(f"{n} [{emoji}]")
             corr_text = '\n'.join(corr_lines)
             if len(corr_text) > 4000:
-                import os as _os
                 side_name = best['side'].lower().replace(' ', '_')
                 txt_path = f"/tmp/correction_auto_{side_name}.txt"
                 with open(txt_path, 'w', encoding='utf-8') as fout:
                     fout.write(corr_text)
                 with open(txt_path, 'rb') as fin:
-                    await context.bot.send_document(
+                    await _send(lambda: context.bot.send_document(
                         chat_id=update.effective_chat.id,
                         document=fin,
                         caption=f"📋 Correction {best['side_emoji']} {best['side']} — {best['display']} | {best['filter']}",
                         filename=f"correction_{side_name}.txt"
-                    )
-                _os.remove(txt_path)
+                    ))
+                await asyncio.to_thread(_safe_unlink, txt_path)
             else:
                 await update.message.reply_text(corr_text)
 
+    @requires('gecartmax')
     async def gecartmax(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gecartmax — Paires de numéros formant l'écart max par catégorie + bilan global."""
-        if not await self._perm(update, 'gecartmax'):
-            return
         games = get_analyzed_games()
         if not games:
             await update.message.reply_text("❌ Aucun jeu chargé. Tapez /gload d'abord.")
             return
 
-        from datetime import datetime as _dt
-        cats = build_category_stats(games)
-
-        def find_max_pair(nums):
-            if len(nums) < 2:
-                return None, 0
-            s = sorted(int(n) for n in nums)
-            max_diff, pair = 0, (s[0], s[1])
-            for i in range(len(s) - 1):
-                diff = s[i + 1] - s[i]
-                if diff > max_diff:
-                    max_diff, pair = diff, (s[i], s[i + 1])
-            return pair, max_diff
-
-        all_categories = [
-            ("🏆 Victoire Joueur",        cats['victoire']['JOUEUR']),
-            ("🏆 Victoire Banquier",       cats['victoire']['BANQUIER']),
-            ("🏆 Victoire Nul",            cats['victoire']['NUL']),
-            ("📊 Parité Pair",             cats['parite']['PAIR']),
-            ("📊 Parité Impair",           cats['parite']['IMPAIR']),
-            ("🎴 Structure 2/2",           cats['structure']['2/2']),
-            ("🎴 Structure 2/3",           cats['structure']['2/3']),
-            ("🎴 Structure 3/2",           cats['structure']['3/2']),
-            ("🎴 Structure 3/3",           cats['structure']['3/3']),
-            ("🎯 Plus/Moins Joueur +6.5",  cats['plusmoins_j']['Plus de 6,5']),
-            ("🎯 Plus/Moins Joueur -4.5",  cats['plusmoins_j']['Moins de 4,5']),
-            ("🎯 Plus/Moins Joueur Neutre", cats['plusmoins_j']['Neutre']),
-            ("🎯 Plus/Moins Banquier +6.5", cats['plusmoins_b']['Plus de 6,5']),
-            ("🎯 Plus/Moins Banquier -4.5", cats['plusmoins_b']['Moins de 4,5']),
-            ("🎯 Plus/Moins Banquier Neutre", cats['plusmoins_b']['Neutre']),
-            ("♠️ Manquant Joueur ♠",       cats['missing_j']['♠']),
-            ("♥️ Manquant Joueur ♥",       cats['missing_j']['♥']),
-            ("♦️ Manquant Joueur ♦",       cats['missing_j']['♦']),
-            ("♣️ Manquant Joueur ♣",       cats['missing_j']['♣']),
-            ("♠️ Manquant Banquier ♠",     cats['missing_b']['♠']),
-            ("♥️ Manquant Banquier ♥",     cats['missing_b']['♥']),
-            ("♦️ Manquant Banquier ♦",     cats['missing_b']['♦']),
-            ("♣️ Manquant Banquier ♣",     cats['missing_b']['♣']),
-            ("🃏 Joueur As",               cats.get('face_j', {}).get('A', [])),
-            ("🃏 Joueur Roi",              cats.get('face_j', {}).get('K', [])),
-            ("🃏 Joueur Dame",             cats.get('face_j', {}).get('Q', [])),
-            ("🃏 Joueur Valet",            cats.get('face_j', {}).get('J', [])),
-            ("🃏 Banquier As",             cats.get('face_b', {}).get('A', [])),
-            ("🃏 Banquier Roi",            cats.get('face_b', {}).get('K', [])),
-            ("🃏 Banquier Dame",           cats.get('face_b', {}).get('Q', [])),
-            ("🃏 Banquier Valet",          cats.get('face_b', {}).get('J', [])),
-        ]
-        face_labels = {'A': 'As', 'K': 'Roi', 'Q': 'Dame', 'J': 'Valet'}
-        fsj = cats.get('face_suit_j', {})
-        fsb = cats.get('face_suit_b', {})
-        for fc in ['A', 'K', 'Q', 'J']:
-            for suit in ['♠', '♥', '♦', '♣']:
-                key = f'{fc}{suit}'
-                all_categories.append((f"🃏 {face_labels[fc]}{SUIT_EMOJI[suit]} Joueur", fsj.get(key, [])))
-                all_categories.append((f"🃏 {face_labels[fc]}{SUIT_EMOJI[suit]} Banquier", fsb.get(key, [])))
+        cats = _get_cached_cats(games)
 
-        detail_lines = ["🔍 <b>PAIRES D'ÉCART MAXIMUM PAR CATÉGORIE</b>\n"]
-        bilan_lines = []
+        rows = []  # (libellé, paire, écart) des catégories non vides
+        for label, group, key in _CATEGORY_SPECS:
+            pair, diff = _cached_max_pair(cats, group, key)
+            if diff:
+                rows.append((label, pair, diff))
 
-        for label, nums in all_categories:
-            if not nums:
-                continue
-            pair, diff = find_max_pair(nums)
-            if diff == 0:
-                continue
-            detail_lines.append(f"<b>{label}</b>")
-            detail_lines.append(f"  N° {pair[0]}  →  N° {pair[1]}  =  <b>{diff}</b>\n")
-            bilan_lines.append(f"{label} : {diff}")
+        # Une seule chaîne par catégorie pour le détail et pour le bilan
+        detail_lines = ["🔍 <b>PAIRES D'ÉCART MAXIMUM PAR CATÉGORIE</b>\n"]
+        detail_lines += [f"<b>{l}</b>\n  N° {p[0]}  →  N° {p[1]}  =  <b>{d}</b>\n" for l, p, d in rows]
 
-        detail_text = '\n'.join(detail_lines)
-        sent = await update.message.reply_text(detail_text, parse_mode='HTML')
-        _schedule_delete(sent, delay=10)
+        # Découpé sous la limite de 4096 caractères, envoyé dans l'ordre via le limiteur global
+        for block in _pack_lines(detail_lines, 3900):
+            sent = await _paced_send(update.message, block, parse_mode=ParseMode.HTML)
+            _schedule_delete(sent, delay=10)
 
-        heure = _dt.now().strftime('%H:%M')
+        heure = datetime.now().strftime('%H:%M')
         nb = len(games)
         bilan_text = (
             f"🌸 <b>BILAN GLOBAL DES ÉCARTS MAX</b> 🌸\n"
             f"⏰ {heure} | 🎲 {nb} jeux\n\n"
-            + '\n'.join(bilan_lines)
+            + '\n'.join(f"{l} : {d}" for l, _, d in rows)
         )
-        await update.message.reply_text(bilan_text, parse_mode='HTML')
+        await _paced_send(update.message, bilan_text, parse_mode=ParseMode.HTML)
 
+    @requires('gclear')
     async def gclear(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gclear — Efface les jeux analysés."""
-        if not await self._perm(update, 'gclear'):
-            return
         clear_analyzed_games()
         await update.message.reply_text("🗑️ Jeux analysés effacés.")
 
+    # Type d'attente → méthode qui traite la saisie
+    _TEXT_HANDLERS = {
+        'helpcl': 'handle_helpcl_input',
+        'predict': 'handle_predict_input',
+        'perm': 'handle_perm_input',
+        'game': 'handle_game_input',
+        'channel': 'handle_channel_input',
+    }
+
     async def handle_text_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Routeur de texte : canal, helpcl, predict, permissions ou analyse de jeu."""
-        uid = update.effective_user.id
-        if _waiting_for_helpcl.get(uid):
-            await self.handle_helpcl_input(update, context)
-        elif _waiting_for_predict.get(uid):
-            await self.handle_predict_input(update, context)
-        elif _waiting_for_perm.get(uid):
-            await self.handle_perm_input(update, context)
-        elif _waiting_for_game.get(uid):
-            await self.handle_game_input(update, context)
-        elif _waiting_for_channel.get(uid):
-            await self.handle_channel_input(update, context)
-        # Sinon, on ignore le message
+        entry = _waiting_state.get(update.effective_user.id)
+        if entry is None:
+            return  # Aucune saisie attendue : on ignore le message
+        handler = self._TEXT_HANDLERS.get(entry[0])
+        if handler:
+            await getattr(self, handler)(update, context)
 
     async def handle_perm_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Reçoit la saisie numérotée de commandes pour addadmin/setperm."""
         uid = update.effective_user.id
-        state = _waiting_for_perm.get(uid)
+        state = _get_wait(uid, 'perm')
         if not state:
             return
 
         text = update.message.text.strip()
         if text.lower() in ('/cancel', 'cancel', 'annuler'):
-            _waiting_for_perm.pop(uid, None)
+            _pop_wait(uid, 'perm')
             await update.message.reply_text("❌ Annulé.")
             return
 
@@ -2667,32 +2934,22 @@ class Handlers:
 
         # Analyse de la saisie : supporte "1,3,4" et "1-5,8,13"
         indices = set()
-        for part in text.replace(' ', ',').split(','):
-            part = part.strip()
-            if not part:
-                continue
-            if '-' in part:
-                bounds = part.split('-', 1)
-                try:
-                    a, b = int(bounds[0]), int(bounds[1])
-                    indices.update(range(a, b + 1))
-                except ValueError:
-                    pass
-            elif part.isdigit():
-                indices.add(int(part))
+        for a, b in _PERM_RE.findall(text):
+            # Plage bornée à la liste : "1-99999" ne génère pas 99999 entiers
+            indices.update(range(int(a), min(int(b or a), _CMD_LEN) + 1))
 
         # Filtrer les indices valides
-        valid = [i for i in sorted(indices) if 1 <= i <= len(ALL_COMMANDS)]
+        valid = [i for i in sorted(indices) if 1 <= i <= _CMD_LEN]
         if not valid:
             await update.message.reply_text(
                 "❌ Aucun numéro valide reconnu.\n"
-                f"Tapez des numéros entre 1 et {len(ALL_COMMANDS)}, ex : <code>1,3,5</code>",
-                parse_mode='HTML'
+                f"Tapez des numéros entre 1 et {_CMD_LEN}, ex : <code>1,3,5</code>",
+                parse_mode=ParseMode.HTML
             )
             return
 
         granted = [ALL_COMMANDS[i - 1] for i in valid]
-        _waiting_for_perm.pop(uid, None)
+        _pop_wait(uid, 'perm')
 
         if action == 'add':
             add_admin(target_uid, granted)
@@ -2701,34 +2958,34 @@ class Handlers:
             update_admin_permissions(target_uid, granted)
             verb = "Permissions mises à jour"
 
-        cmds_str = '\n'.join(f"  {i}. {c}" for i, c in zip(valid, granted))
+        cmds_str = '\n'.join(_CMD_NUMBERED[i - 1] for i in valid)
         await update.message.reply_text(
             f"✅ <b>{verb}</b> : <code>{target_uid}</code>\n\n"
             f"🔑 Commandes accordées :\n{cmds_str}",
-            parse_mode='HTML'
+            parse_mode=ParseMode.HTML
         )
 
     async def handle_game_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Reçoit le texte de jeu quand le bot attend une analyse."""
         if not is_admin(update.effective_user.id):
             return
-        if not _waiting_for_game.get(update.effective_user.id):
+        if not _get_wait(update.effective_user.id, 'game'):
             return
 
         text = update.message.text.strip()
         if text.lower() in ('/cancel', 'cancel', 'annuler'):
-            _waiting_for_game.pop(update.effective_user.id, None)
+            _pop_wait(update.effective_user.id, 'game')
             await update.message.reply_text("❌ Annulé.")
             return
 
         game = parse_game(text)
-        _waiting_for_game.pop(update.effective_user.id, None)
+        _pop_wait(update.effective_user.id, 'game')
 
         if not game:
             await update.message.reply_text(
                 "❌ Format non reconnu.\n\n"
                 "Exemple attendu :\n`#N794. ✅3(K♦️4♦️9♦️) - 1(J♦️10♥️A♠️) #T4`",
-                parse_mode='Markdown'
+                parse_mode=ParseMode.MARKDOWN
             )
             return
 
@@ -2737,10 +2994,9 @@ class Handlers:
 
     # ── SYSTÈME DE PRÉDICTION ─────────────────────────────────────────────────
 
+    @requires('predictsetup')
     async def predictsetup(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/predictsetup — Configure les canaux de prédiction (rôles stats/prédicteur)."""
-        if not await self._perm(update, 'predictsetup'):
-            return
         channels = get_channels()
         if not channels:
             await update.message.reply_text(
@@ -2755,22 +3011,21 @@ class Handlers:
                 "• 1 canal <b>statistiques</b> (résultats #N)\n"
                 "• 1 canal <b>prédicteur</b> (optionnel, pour cross-analyse)\n\n"
                 "Ajoutez d'autres canaux avec /addchannel.",
-                parse_mode='HTML'
+                parse_mode=ParseMode.HTML
             )
             return
 
         cfg = get_predict_config()
         roles = cfg.get('channels', {})
 
-        _waiting_for_predict[update.effective_user.id] = {'channels': channels}
+        _set_wait(update.effective_user.id, 'predict', {'channels': channels})
 
-        role_labels = {'stats': '📊 STATS', 'predictor': '🎯 PRÉDICTEUR'}
         lines = ["🔧 <b>CONFIGURATION DES CANAUX DE PRÉDICTION</b>\n"]
         lines.append("Assignez un rôle à chaque canal :\n")
         for i, ch in enumerate(channels, 1):
-            name = ch.get('name') or ch['id']
+            name = _ch_name_html(ch)
             role = roles.get(ch['id'], '—')
-            role_txt = role_labels.get(role, '❔ non assigné')
+            role_txt = _ROLE_LABELS.get(role, '❔ non assigné')
             lines.append(f"<b>{i}.</b> {name}\n   <code>{ch['id']}</code>  →  {role_txt}")
 
         lines.append("\n<b>Rôles disponibles :</b>")
@@ -2781,77 +3036,73 @@ class Handlers:
         lines.append("  Ex : <code>1=S</code> (un seul canal stats suffit)")
         lines.append("\nTapez <code>reset</code> pour effacer la configuration.")
         lines.append("Tapez <code>sortir</code> pour annuler.")
-        await update.message.reply_text('\n'.join(lines), parse_mode='HTML')
+        await update.message.reply_text('\n'.join(lines), parse_mode=ParseMode.HTML)
 
     async def handle_predict_input(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Reçoit la saisie des rôles dans /predictsetup."""
         uid = update.effective_user.id
-        state = _waiting_for_predict.get(uid)
+        state = _get_wait(uid, 'predict')
         if not state:
             return
 
         text = update.message.text.strip().lower()
 
         if text in ('sortir', 'exit', 'cancel', 'annuler', '/cancel'):
-            _waiting_for_predict.pop(uid, None)
+            _pop_wait(uid, 'predict')
             await update.message.reply_text("↩️ Configuration annulée.")
             return
 
         if text == 'reset':
             reset_predict_config()
-            _waiting_for_predict.pop(uid, None)
+            _pop_wait(uid, 'predict')
             await update.message.reply_text("🗑️ Configuration de prédiction réinitialisée.")
             return
 
         channels = state['channels']
         # Parser "1=S 2=P 3=S" etc.
-        role_map = {'s': 'stats', 'stats': 'stats', 'p': 'predictor', 'predicteur': 'predictor', 'predictor': 'predictor'}
         assignments = {}
         errors = []
-        for token in text.replace(',', ' ').split():
-            if '=' in token:
-                parts = token.split('=', 1)
-                idx_str, role_str = parts[0].strip(), parts[1].strip()
-                if not idx_str.isdigit():
-                    errors.append(f"'{token}' invalide")
-                    continue
-                idx = int(idx_str)
-                if not (1 <= idx <= len(channels)):
-                    errors.append(f"Canal {idx} n'existe pas")
-                    continue
-                role = role_map.get(role_str)
-                if not role:
-                    errors.append(f"Rôle '{role_str}' inconnu (S ou P)")
-                    continue
-                assignments[channels[idx - 1]['id']] = role
+        for m in _PREDICT_RE.finditer(text):
+            idx_str, role_str = m.groups()
+            if not idx_str.isdigit():
+                errors.append(f"'{idx_str}={role_str}' invalide")
+                continue
+            idx = int(idx_str)
+            if not (1 <= idx <= len(channels)):
+                errors.append(f"Canal {idx} n'existe pas")
+                continue
+            role = _ROLE_MAP.get(role_str)
+            if not role:
+                errors.append(f"Rôle '{role_str}' inconnu (S ou P)")
+                continue
+            assignments[channels[idx - 1]['id']] = role
 
         if errors:
             await update.message.reply_text(
                 "❌ Erreurs :\n" + '\n'.join(f'  • {e}' for e in errors) +
-                "\n\nFormat : <code>1=S 2=P</code>", parse_mode='HTML'
+                "\n\nFormat : <code>1=S 2=P</code>", parse_mode=ParseMode.HTML
             )
             return
 
         if not assignments:
             await update.message.reply_text(
                 "❌ Aucune assignation reconnue.\nFormat : <code>1=S 2=P</code>",
-                parse_mode='HTML'
+                parse_mode=ParseMode.HTML
             )
             return
 
         # Sauvegarder
         for cid, role in assignments.items():
             set_channel_role(cid, role)
-        _waiting_for_predict.pop(uid, None)
+        _pop_wait(uid, 'predict')
 
         cfg = get_predict_config()
         roles_saved = cfg.get('channels', {})
-        role_labels = {'stats': '📊 STATS', 'predictor': '🎯 PRÉDICTEUR'}
         lines = ["✅ <b>Configuration sauvegardée !</b>\n"]
         for ch in channels:
             role = roles_saved.get(ch['id'], '—')
-            role_txt = role_labels.get(role, '❔ non assigné')
-            name = ch.get('name') or ch['id']
+            role_txt = _ROLE_LABELS.get(role, '❔ non assigné')
+            name = _ch_name_html(ch)
             lines.append(f"• {name} → {role_txt}")
 
         stats_chs = get_stats_channels()
@@ -2861,12 +3112,11 @@ class Handlers:
             lines.append("2. Tapez /gpredict N1 N2 pour générer des prédictions")
         else:
             lines.append("⚠️ Aucun canal STATS défini — ajoutez au moins un canal S.")
-        await update.message.reply_text('\n'.join(lines), parse_mode='HTML')
+        await update.message.reply_text('\n'.join(lines), parse_mode=ParseMode.HTML)
 
+    @requires('gpredictload')
     async def gpredictload(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gpredictload — Charge les jeux depuis tous les canaux statistiques configurés."""
-        if not await self._perm(update, 'gpredictload'):
-            return
         stats_chs = get_stats_channels()
         if not stats_chs:
             await update.message.reply_text(
@@ -2878,50 +3128,64 @@ class Handlers:
         from config import API_ID, API_HASH, SESSION_PATH, TELETHON_SESSION_STRING
         from telethon import TelegramClient
         from telethon.sessions import StringSession
-        from game_analyzer import parse_game
-        import asyncio
 
         msg = await update.message.reply_text(
             f"⏳ Chargement des jeux depuis <b>{len(stats_chs)}</b> canal(aux) statistiques…",
-            parse_mode='HTML'
+            parse_mode=ParseMode.HTML
         )
 
-        all_games = []
-        seen_nums = set()
+        async def _scan(client, cid):
+            """Jeux d'un canal statistiques (liste locale, sans état partagé)."""
+            found = []
+            async for message in client.iter_messages(int(cid), limit=5000):
+                if not message.text:
+                    continue
+                game = parse_game(message.text)
+                if game:
+                    found.append(game)
+            return found
 
         async def _load_from_stats():
-            try:
-                session = StringSession(TELETHON_SESSION_STRING) if TELETHON_SESSION_STRING else SESSION_PATH
-                client = TelegramClient(session, API_ID, API_HASH)
-                await client.connect()
-                for cid in stats_chs:
-                    count = 0
-                    async for message in client.iter_messages(int(cid), limit=5000):
-                        if not message.text:
-                            continue
-                        game = parse_game(message.text)
-                        if game and game['numero'] not in seen_nums:
-                            seen_nums.add(game['numero'])
-                            all_games.append(game)
-                            count += 1
-                await client.disconnect()
-                all_games.sort(key=lambda g: int(g['numero']))
-                save_analyzed_games(all_games)
-                await msg.edit_text(
-                    f"✅ <b>{len(all_games)}</b> jeux chargés depuis {len(stats_chs)} canal(aux) statistiques.\n\n"
-                    f"Tapez /gpredict N1 N2 pour générer des prédictions.\n"
-                    f"Tapez /gstats pour voir le résumé.",
-                    parse_mode='HTML'
-                )
-            except Exception as e:
-                await msg.edit_text(f"❌ Erreur lors du chargement : {e}")
+            async with _chat_locks[update.effective_chat.id]:
+                try:
+                    session = StringSession(TELETHON_SESSION_STRING) if TELETHON_SESSION_STRING else SESSION_PATH
+                    client = TelegramClient(session, API_ID, API_HASH)
+                    await client.connect()
+                    try:
+                        # Canaux parcourus en parallèle sur le même client
+                        per_channel = await asyncio.gather(*(_scan(client, cid) for cid in stats_chs))
+                    finally:
+                        await client.disconnect()
+
+                    # Dédoublonnage dans l'ordre des canaux : le premier canal garde la priorité
+                    seen_nums = set()
+                    chan_games = []
+                    for found in per_channel:
+                        kept = []
+                        for game in found:
+                            if game['numero'] not in seen_nums:
+                                seen_nums.add(game['numero'])
+                                kept.append(game)
+                        # Chaque canal est lu du plus récent au plus ancien : tri quasi inversé
+                        kept.sort(key=_by_numero)
+                        chan_games.append(kept)
+                    all_games = list(merge(*chan_games, key=_by_numero))
+                    await asyncio.to_thread(save_analyzed_games, all_games)
+                    await msg.edit_text(
+                        f"✅ <b>{len(all_games)}</b> jeux chargés depuis {len(stats_chs)} canal(aux) statistiques.\n\n"
+                        f"Tapez /gpredict N1 N2 pour générer des prédictions.\n"
+                        f"Tapez /gstats pour voir le résumé.",
+                        parse_mode=ParseMode.HTML
+                    )
+                except Exception as e:
+                    await msg.edit_text(f"❌ Erreur lors du chargement : {e}")
 
         context.application.create_task(_load_from_stats())
 
+    @requires('gpredict')
     async def gpredict(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/gpredict N1 N2 — Liste de prédictions par catégorie pour les jeux N1 à N2."""
-        if not await self._perm(update, 'gpredict'):
-            return
+        games_ver = analyzed_games_signature()  # avant la lecture : jamais plus récente que `games`
         games = get_analyzed_games()
         if not games:
             await update.message.reply_text(
@@ -2934,7 +3198,7 @@ class Handlers:
 
         # Extraire options de date si présentes
         num_kw, _, from_date_gp, to_date_gp = parse_search_options(raw_args)
-        games = _filter_games_by_date(games, from_date_gp, to_date_gp)
+        games = _filter_games_by_date(games, from_date_gp, to_date_gp, version=games_ver)
         if not games:
             await update.message.reply_text(
                 "❌ Aucun jeu dans cette plage de dates. Vérifiez les paramètres from:/to:."
@@ -2942,8 +3206,11 @@ class Handlers:
             return
 
         args = num_kw  # arguments restants (numéros)
-        all_nums = sorted(int(g['numero']) for g in games)
-        last_known = all_nums[-1]
+        nums_key = (games_ver, from_date_gp, to_date_gp)
+        if games_ver is None or _sorted_nums_cache['key'] != nums_key:
+            _sorted_nums_cache['nums'] = sorted(g['numero_int'] for g in games)
+            _sorted_nums_cache['key'] = nums_key
+        last_known = _sorted_nums_cache['nums'][-1]
 
         from_num = to_num = None
         if len(args) >= 2 and args[0].isdigit() and args[1].isdigit():
@@ -2972,7 +3239,7 @@ class Handlers:
                 f"  <code>/gpredict {last_known+1} {last_known+50}</code>\n"
                 f"  <code>/gpredict 30</code> — les 30 prochains\n"
                 f"  <code>/gpredict 30 from:2026-02-20 to:2026-02-23</code>",
-                parse_mode='HTML'
+                parse_mode=ParseMode.HTML
             )
             return
 
@@ -2990,51 +3257,59 @@ class Handlers:
         msg = await update.message.reply_text(
             f"🔮 Analyse de <b>{nb_range}</b> jeu(x) en cours…\n"
             f"Plage : <b>#N{from_num}</b> → <b>#N{to_num}</b>",
-            parse_mode='HTML'
+            parse_mode=ParseMode.HTML
         )
 
-        from datetime import datetime as _dt
-        import asyncio as _asyncio
-
         nb_games = len(games)
-        cat_results = generate_category_list(games, from_num, to_num, min_confidence=35)
+        chat_id = update.effective_chat.id
 
-        await msg.delete()
+        async def _run():
+            # Verrou par discussion : les analyses d'un même chat restent dans l'ordre,
+            # celles des autres chats avancent en parallèle
+            async with _chat_locks[chat_id]:
+                try:
+                    cat_results = await asyncio.to_thread(
+                        generate_category_list, games, from_num, to_num, min_confidence=35
+                    )
+                except Exception as e:
+                    logger.error(f"gpredict error: {e}")
+                    await msg.edit_text(f"❌ Erreur: {str(e)[:300]}")
+                    return
 
-        if not cat_results:
-            await update.message.reply_text(
-                "❌ Aucune prédiction trouvée pour cette plage.\n\n"
-                "Conseils :\n"
-                "• Élargissez la plage (#N plus éloignés)\n"
-                "• Chargez plus de jeux avec /gpredictload\n"
-                "• Le seuil de confiance est de 35% — les catégories analysées "
-                "ne montrent pas encore de retard significatif."
-            )
-            return
+                await msg.delete()
 
-        # En-tête
-        heure = _dt.now().strftime('%H:%M')
-        total_preds = sum(len(v['nums']) for v in cat_results.values())
-        header = (
-            f"🔮 <b>LISTE DE PRÉDICTIONS</b>\n"
-            f"⏰ {heure}  |  🎲 {nb_games} jeux analysés\n"
-            f"📐 Plage : <b>#N{from_num}</b> → <b>#N{to_num}</b>\n"
-            f"🎯 <b>{total_preds}</b> prédiction(s) en <b>{len(cat_results)}</b> catégorie(s)\n"
-            f"<i>Chaque numéro n'apparaît que dans une seule catégorie.</i>"
-        )
-        await update.message.reply_text(header, parse_mode='HTML')
-        await _asyncio.sleep(0.2)
+                if not cat_results:
+                    await update.message.reply_text(
+                        "❌ Aucune prédiction trouvée pour cette plage.\n\n"
+                        "Conseils :\n"
+                        "• Élargissez la plage (#N plus éloignés)\n"
+                        "• Chargez plus de jeux avec /gpredictload\n"
+                        "• Le seuil de confiance est de 35% — les catégories analysées "
+                        "ne montrent pas encore de retard significatif."
+                    )
+                    return
+
+                # En-tête
+                heure = datetime.now().strftime('%H:%M')
+                total_preds = sum(len(v['nums']) for v in cat_results.values())
+                header = (
+                    f"🔮 <b>LISTE DE PRÉDICTIONS</b>\n"
+                    f"⏰ {heure}  |  🎲 {nb_games} jeux analysés\n"
+                    f"📐 Plage : <b>#N{from_num}</b> → <b>#N{to_num}</b>\n"
+                    f"🎯 <b>{total_preds}</b> prédiction(s) en <b>{len(cat_results)}</b> catégorie(s)\n"
+                    f"<i>Chaque numéro n'apparaît que dans une seule catégorie.</i>"
+                )
+                # En-tête, catégories et résumé final regroupés en messages de 4000 caractères
+                # au plus (envoyés dans l'ordre, cadencés)
+                parts = [header, *format_category_list(cat_results, nb_games, from_num, to_num)]
+                for m in _pack_lines(parts, 4000, sep='\n\n──────\n\n'):
+                    await _paced_send(update.message, m, parse_mode=ParseMode.HTML)
 
-        # Un message par catégorie + résumé final
-        msgs = format_category_list(cat_results, nb_games, from_num, to_num)
-        for m in msgs:
-            await update.message.reply_text(m, parse_mode='HTML')
-            await _asyncio.sleep(0.3)
+        context.application.create_task(_run())
 
+    @requires('reset')
     async def reset(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """/reset — Force l'effacement de toutes les données sauf la session."""
-        if not await self._perm(update, 'reset'): return
-        
         msg = await update.message.reply_text("⏳ Réinitialisation forcée en cours...")
         try:
             reset_all_data()
@@ -3042,9 +3317,8 @@ class Handlers:
         except Exception as e:
             await msg.edit_text(f"❌ Erreur lors du reset : {e}")
 
+    @requires('clear')
     async def clear(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        if not await self._perm(update, 'clear'):
-            return
         clear_all()
         await update.message.reply_text("🗑️ Effacé !")
 
@@ -3057,8 +3331,25 @@ async def _reset_state_on_command(update: Update, context: ContextTypes.DEFAULT_
         _clear_waits(update.effective_user.id)
 
 
+async def _on_shutdown(application: Application):
+    """post_shutdown : arrête les processus d'analyse PDF sans attendre
+    et ferme la session Telethon persistante."""
+    handlers._pdf_pool.shutdown(wait=False, cancel_futures=True)
+    async with _client_lock:
+        await scraper.close_pooled()
+
+
 def setup_bot():
-    app = Application.builder().token(BOT_TOKEN).build()
+    # Pool de connexions keep-alive partagé par les envois concurrents ; get_updates
+    # garde sa propre connexion pour que le long polling n'occupe pas le pool.
+    app = (
+        Application.builder()
+        .token(BOT_TOKEN)
+        .request(HTTPXRequest(connection_pool_size=32, pool_timeout=5.0, connect_timeout=3.0))
+        .get_updates_request(HTTPXRequest(connection_pool_size=1))
+        .post_shutdown(_on_shutdown)
+        .build()
+    )
 
     # Priorité haute : efface tout état d'attente à chaque nouvelle commande
     app.add_handler(
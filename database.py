@@ -1,20 +1,39 @@
 import sqlite3
 import json
-from datetime import datetime
+import atexit
+import threading
+from collections import namedtuple
 from contextlib import contextmanager
 import os
 
 DB_PATH = os.getenv('DATABASE_PATH', '/data/predictions.db')
 
+# Connexion unique du processus (ouverte au premier usage), sérialisée par un verrou
+_conn = None
+_conn_lock = threading.RLock()
+
+def _connect():
+    global _conn
+    if _conn is None:
+        conn = sqlite3.connect(DB_PATH, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        # WAL : lectures non bloquées par les écritures, commits sans fsync du journal complet
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA temp_store=MEMORY')
+        _conn = conn
+    return _conn
+
 @contextmanager
 def get_db():
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    try:
-        yield conn
-        conn.commit()
-    finally:
-        conn.close()
+    with _conn_lock:
+        conn = _connect()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
 
 def init_db():
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
@@ -24,6 +43,7 @@ def init_db():
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 message_id INTEGER UNIQUE,
                 numero TEXT,
+                numero_int INTEGER,
                 couleur TEXT,
                 statut TEXT,
                 raw_text TEXT,
@@ -37,39 +57,133 @@ def init_db():
                 sync_date TIMESTAMP
             )
         ''')
+        # Migration : numéro entier (comparaisons et index numériques)
+        cols = {row['name'] for row in conn.execute('PRAGMA table_info(predictions)')}
+        if 'numero_int' not in cols:
+            conn.execute('ALTER TABLE predictions ADD COLUMN numero_int INTEGER')
+        conn.execute('UPDATE predictions SET numero_int = CAST(numero AS INTEGER) '
+                     'WHERE numero_int IS NULL')
+        # L'ancien index texte n'est plus interrogé (remplacé par idx_pred_num_int)
+        conn.execute('DROP INDEX IF EXISTS idx_pred_numero')
+        # Index des filtres et du tri de get_predictions
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_pred_num_int ON predictions(numero_int)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_pred_couleur ON predictions(couleur)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_pred_statut ON predictions(statut)')
+        conn.execute('CREATE INDEX IF NOT EXISTS idx_pred_msgid ON predictions(message_id DESC)')
         conn.execute('''
             INSERT OR IGNORE INTO last_sync (id, last_message_id, sync_date) 
             VALUES (1, 0, NULL)
         ''')
 
+# Tampon d'écriture : vidé par lots de 500 ou au plus 3 s après le premier ajout
+_pending: list = []
+_FLUSH_SIZE = 500
+_FLUSH_DELAY = 3.0
+_flush_timer = None
+
 def save_prediction(message_id, numero, couleur, statut, raw_text):
+    global _flush_timer
+    with _conn_lock:
+        _pending.append((message_id, numero, int(numero), couleur, statut, raw_text))
+        if len(_pending) >= _FLUSH_SIZE:
+            flush_predictions()
+        elif _flush_timer is None:
+            _flush_timer = threading.Timer(_FLUSH_DELAY, flush_predictions)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+
+def flush_predictions():
+    """Écrit les prédictions en attente en une seule transaction."""
+    global _flush_timer
+    with _conn_lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        if not _pending:
+            return
+        with get_db() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO predictions 
+                (message_id, numero, numero_int, couleur, statut, raw_text)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', _pending)
+        _pending.clear()
+
+atexit.register(flush_predictions)
+
+# Ligne de la table predictions, sans dict par ligne (namedtuple : __slots__ vide)
+Pred = namedtuple('Pred', 'id message_id numero couleur statut raw_text date')
+
+def _build_query(mask, exact):
+    """Texte SQL pour une combinaison de filtres (bits : couleur, statut, numero)."""
+    op = "= ?" if exact else "LIKE ?"
+    query = f"SELECT {', '.join(Pred._fields)} FROM predictions WHERE 1=1"
+    if mask & 1:
+        query += f" AND couleur {op}"
+    if mask & 2:
+        query += f" AND statut {op}"
+    if mask & 4:
+        query += " AND numero_int = ?"
+    return query + " ORDER BY message_id DESC"
+
+# Les 16 variantes (8 combinaisons × exact) construites une seule fois ;
+# le cache de requêtes préparées de sqlite3 réutilise ensuite le même texte
+_QUERIES = {(mask, exact): _build_query(mask, exact)
+            for mask in range(8) for exact in (False, True)}
+
+def _predictions_query(filters, exact):
+    """Requête SELECT et paramètres correspondant aux filtres."""
+    mask = 0
+    params = []
+    
+    if filters:
+        if filters.get('couleur'):
+            mask |= 1
+            params.append(filters['couleur'] if exact else f"%{filters['couleur']}%")
+        if filters.get('statut'):
+            mask |= 2
+            params.append(filters['statut'] if exact else f"%{filters['statut']}%")
+        if filters.get('numero'):
+            mask |= 4
+            params.append(int(filters['numero']))
+    
+    return _QUERIES[mask, bool(exact)], params
+
+def iter_predictions(filters=None, exact=False):
+    """Comme get_predictions, mais produit des Pred au fil du curseur.
+
+    Le verrou de connexion n'est tenu que pendant chaque fetchmany(1000) :
+    un consommateur lent ou arrêté en route ne bloque pas les autres threads.
+    """
+    flush_predictions()
+    query, params = _predictions_query(filters, exact)
     with get_db() as conn:
-        conn.execute('''
-            INSERT OR REPLACE INTO predictions 
-            (message_id, numero, couleur, statut, raw_text, date)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (message_id, numero, couleur, statut, raw_text, datetime.now()))
+        cursor = conn.cursor()
+        cursor.row_factory = None
+        cursor.arraysize = 1000
+        cursor.execute(query, params)
+    try:
+        while True:
+            with _conn_lock:
+                rows = cursor.fetchmany()
+            if not rows:
+                break
+            for row in rows:
+                yield Pred._make(row)
+    finally:
+        with _conn_lock:
+            cursor.close()
+
+def get_predictions(filters=None, exact=False):
+    """Prédictions filtrées (dicts), plus récentes d'abord.
 
-def get_predictions(filters=None):
+    exact=True compare couleur/statut par égalité (index utilisable)
+    au lieu d'une recherche de sous-chaîne LIKE '%x%'.
+    """
+    flush_predictions()
+    query, params = _predictions_query(filters, exact)
     with get_db() as conn:
-        query = "SELECT * FROM predictions WHERE 1=1"
-        params = []
-        
-        if filters:
-            if filters.get('couleur'):
-                query += " AND couleur LIKE ?"
-                params.append(f"%{filters['couleur']}%")
-            if filters.get('statut'):
-                query += " AND statut LIKE ?"
-                params.append(f"%{filters['statut']}%")
-            if filters.get('numero'):
-                query += " AND numero = ?"
-                params.append(filters['numero'])
-        
-        query += " ORDER BY message_id DESC"
-        
-        cursor = conn.execute(query, params)
-        return [dict(row) for row in cursor.fetchall()]
+        return [dict(row) for row in conn.execute(query, params)]
 
 def get_last_sync():
     with get_db() as conn:
@@ -80,11 +194,12 @@ def update_last_sync(message_id):
     with get_db() as conn:
         conn.execute('''
             UPDATE last_sync 
-            SET last_message_id = ?, sync_date = ?
+            SET last_message_id = ?, sync_date = CURRENT_TIMESTAMP
             WHERE id = 1
-        ''', (message_id, datetime.now()))
+        ''', (message_id,))
 
 def get_stats():
+    flush_predictions()
     with get_db() as conn:
         total = conn.execute('SELECT COUNT(*) FROM predictions').fetchone()[0]
         return {'total': total}
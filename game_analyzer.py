@@ -1,11 +1,17 @@
 import re
+from itertools import islice
+from operator import sub
 
 SUITS = ['♠', '♥', '♦', '♣']
 SUIT_EMOJI = {'♠': '♠️', '♥': '♥️', '♦': '♦️', '♣': '♣️'}
 FACE_CARDS = ['A', 'K', 'Q', 'J']
+# Costumes dans l'ordre de sorted() : missing_* se construit sans différence ni tri
+_SORTED_SUITS = tuple(sorted(SUITS))
 
 _FACE_CARD_RE = re.compile(r'([AKQJ])(?:♠️|♥️|♦️|♣️|♠|♥|♦|♣)')
 _FACE_CARD_SUIT_RE = re.compile(r'([AKQJ])(♠️|♥️|♦️|♣️|♠|♥|♦|♣)')
+# Un symbole de costume par carte, précédé de sa valeur si c'est A/K/Q/J
+_CARD_RE = re.compile(r'([AKQJ]?)([♠♥♦♣])')
 
 # Formats supportés :
 #   ✅3(K♦️4♦️9♦️) - 1(J♦️10♥️A♠️)   → victoire joueur/banquier
@@ -14,15 +20,15 @@ _FACE_CARD_SUIT_RE = re.compile(r'([AKQJ])(♠️|♥️|♦️|♣️|♠|♥|
 #   🔰 avant ou après #N, ou n'importe où → nul détecté par 'in text'
 GAME_PATTERN = re.compile(
     r'#N(\d+)[.\s]*'
-    r'(✅|🔰|🟣)?\s*(\d+)\(([^)]+)\)\s*(?:-|🔰)\s*(✅|🔰|🟣)?\s*(\d+)\(([^)]+)\)\s*#T(\d+)',
-    re.UNICODE
+    r'(✅|🔰|🟣)?\s*(\d+)\(([^)]+)\)\s*(?:-|🔰)\s*(✅|🔰|🟣)?\s*(\d+)\(([^)]+)\)\s*#T(\d+)'
 )
 
 # Pattern de secours pour matchs nuls avec format différent (🔰 n'importe où)
+# Segments intermédiaires bornés et sans '#' : pas de retour arrière au-delà
+# de l'enregistrement courant sur un texte long ou mal formé
 NUL_FALLBACK_PATTERN = re.compile(
     r'#N(\d+)[.\s,]*'
-    r'(\d+)\(([^)]+)\).*?(\d+)\(([^)]+)\).*?#T(\d+)',
-    re.UNICODE | re.DOTALL
+    r'(\d+)\(([^)]+)\)[^#]{0,400}?(\d+)\(([^)]+)\)[^#]{0,400}#T(\d+)'
 )
 
 
@@ -50,58 +56,77 @@ def extract_face_card_suits(cards_str: str) -> list:
 
 def extract_suits_present(cards_str):
     """Retourne les costumes présents dans une main."""
-    return {ch for ch in cards_str if ch in '♠♥♦♣'}
+    return {s for s in SUITS if s in cards_str}
 
 
 def count_cards(cards_str):
     """Compte le nombre de cartes via les symboles de costume."""
-    return sum(1 for ch in cards_str if ch in '♠♥♦♣')
+    # str.count tourne en C : 4 passes natives au lieu d'une boucle par caractère
+    return (cards_str.count('♠') + cards_str.count('♥')
+            + cards_str.count('♦') + cards_str.count('♣'))
+
+
+def _summarize_hand(cards_str):
+    """Nombre de cartes, costumes présents, valeurs et paires (valeur, costume)
+    d'une main, en une seule passe regex."""
+    pairs = _CARD_RE.findall(cards_str)
+    face_suits = [(f, s) for f, s in pairs if f]
+    return (len(pairs), {s for _, s in pairs},
+            sorted({f for f, _ in face_suits}), face_suits)
+
+
+# Catégorie Plus/Moins indexée par score (0 à 10)
+_PLUSMOINS_BY_SCORE = ('Moins de 4,5',) * 5 + ('Neutre',) * 2 + ('Plus de 6,5',) * 4
+
+
+def status_kind(statut):
+    """Classe un statut de prédiction : 'won' (gagné), 'lost' (perdu) ou 'other'."""
+    statut = statut.lower()
+    if 'gagn' in statut:
+        return 'won'
+    if 'perd' in statut:
+        return 'lost'
+    return 'other'
 
 
 def get_plusmoins(score):
     score = int(score)
-    if score >= 7:
-        return 'Plus de 6,5'
-    elif score <= 4:
-        return 'Moins de 4,5'
-    else:
-        return 'Neutre'
+    if 0 <= score <= 10:
+        return _PLUSMOINS_BY_SCORE[score]
+    return 'Plus de 6,5' if score >= 7 else 'Moins de 4,5'
 
 
 def parse_game(text):
     """Parse un enregistrement de jeu. Retourne un dict ou None."""
+    # Pré-filtre : les deux patterns exigent #N et #T (recherche de sous-chaîne en C)
+    if '#N' not in text or '#T' not in text:
+        return None
+    is_nul = '🔰' in text
     match = GAME_PATTERN.search(text)
     using_fallback = False
 
     if not match:
         # Tentative avec le pattern de secours uniquement si 🔰 est présent
-        if '🔰' in text:
+        if is_nul:
             match = NUL_FALLBACK_PATTERN.search(text)
             using_fallback = True
         if not match:
             return None
 
-    numero = match.group(1)
+    # Un seul appel groups() au lieu d'un group(i) par champ
     if using_fallback:
         # Groupes du NUL_FALLBACK_PATTERN : 1=N, 2=score_j, 3=cards_j, 4=score_b, 5=cards_b, 6=total
-        marker_j = None
-        score_j = int(match.group(2))
-        cards_j_str = match.group(3)
-        marker_b = None
-        score_b = int(match.group(4))
-        cards_b_str = match.group(5)
-        total = int(match.group(6))
+        numero, score_j, cards_j_str, score_b, cards_b_str, total = match.groups()
+        marker_j = marker_b = None
     else:
-        marker_j = match.group(2)
-        score_j = int(match.group(3))
-        cards_j_str = match.group(4)
-        marker_b = match.group(5)
-        score_b = int(match.group(6))
-        cards_b_str = match.group(7)
-        total = int(match.group(8))
+        (numero, marker_j, score_j, cards_j_str,
+         marker_b, score_b, cards_b_str, total) = match.groups()
+    score_j = int(score_j)
+    score_b = int(score_b)
+    total = int(total)
 
     # 🔰 n'importe où dans le message = match nul (quelle que soit sa position)
-    if '🔰' in text:
+    if is_nul:
         victoire = 'NUL'
     elif marker_j == '✅':
         victoire = 'JOUEUR'
@@ -112,20 +137,15 @@ def parse_game(text):
     else:
         victoire = 'JOUEUR' if score_j > score_b else 'BANQUIER'
 
-    cards_j = count_cards(cards_j_str)
-    cards_b = count_cards(cards_b_str)
-    suits_j = extract_suits_present(cards_j_str)
-    suits_b = extract_suits_present(cards_b_str)
-    face_j = sorted(extract_face_cards(cards_j_str))
-    face_b = sorted(extract_face_cards(cards_b_str))
-    face_suit_j = extract_face_card_suits(cards_j_str)
-    face_suit_b = extract_face_card_suits(cards_b_str)
-    missing_j = sorted({'♠', '♥', '♦', '♣'} - suits_j)
-    missing_b = sorted({'♠', '♥', '♦', '♣'} - suits_b)
+    cards_j, suits_j, face_j, face_suit_j = _summarize_hand(cards_j_str)
+    cards_b, suits_b, face_b, face_suit_b = _summarize_hand(cards_b_str)
+    missing_j = [s for s in _SORTED_SUITS if s not in suits_j]
+    missing_b = [s for s in _SORTED_SUITS if s not in suits_b]
     parite = 'PAIR' if total % 2 == 0 else 'IMPAIR'
 
     return {
         'numero': numero,
+        'numero_int': int(numero),
         'victoire': victoire,
         'score_j': score_j,
         'score_b': score_b,
@@ -146,32 +166,41 @@ def parse_game(text):
     }
 
 
+_ANALYSIS_TEMPLATE = (
+    "#N{numero}\n\n"
+    "🏆 Victoire : {victoire}\n"
+    "🎯 Score : {score_j} - {score_b}\n"
+    "📊 Total : {total} ({parite})\n\n"
+    "🎴 Cartes :\n"
+    "Joueur : {cards_j}K\n"
+    "Banquier : {cards_b}K\n"
+    "Structure : {structure}\n\n"
+    "🎯 Plus/Moins :\n"
+    "Joueur : {plusmoins_j}\n"
+    "Banquier : {plusmoins_b}\n\n"
+    "{manquants}"
+)
+
+
 def format_analysis(game):
     """Formate l'analyse d'un jeu pour affichage."""
-    lines = [f"#N{game['numero']}\n"]
-    lines.append(f"🏆 Victoire : {game['victoire']}")
-    lines.append(f"🎯 Score : {game['score_j']} - {game['score_b']}")
-    lines.append(f"📊 Total : {game['total']} ({game['parite']})\n")
-    lines.append("🎴 Cartes :")
-    lines.append(f"Joueur : {game['cards_j']}K")
-    lines.append(f"Banquier : {game['cards_b']}K")
-    lines.append(f"Structure : {game['structure']}\n")
-    lines.append("🎯 Plus/Moins :")
-    lines.append(f"Joueur : {game['plusmoins_j']}")
-    lines.append(f"Banquier : {game['plusmoins_b']}\n")
-    for suit in ['♠', '♥', '♦', '♣']:
-        j_mark = '✅' if suit in game['missing_j'] else '❌'
-        b_mark = '✅' if suit in game['missing_b'] else '❌'
-        lines.append(f"{SUIT_EMOJI[suit]} Manquant : Joueur {j_mark}, Banquier {b_mark}")
-    return '\n'.join(lines)
+    missing_j = game['missing_j']
+    missing_b = game['missing_b']
+    manquants = '\n'.join(
+        f"{SUIT_EMOJI[suit]} Manquant : Joueur {'✅' if suit in missing_j else '❌'}, "
+        f"Banquier {'✅' if suit in missing_b else '❌'}"
+        for suit in SUITS
+    )
+    return _ANALYSIS_TEMPLATE.format(**game, manquants=manquants)
 
 
 def calculate_ecarts(numbers):
     """Calcule les écarts entre numéros consécutifs."""
-    nums = sorted([int(n) for n in numbers])
+    nums = sorted(map(int, numbers))
     if len(nums) < 2:
         return nums, []
-    return nums, [nums[i + 1] - nums[i] for i in range(len(nums) - 1)]
+    # islice évite la copie nums[1:] ; map(sub) fait la boucle en C
+    return nums, list(map(sub, islice(nums, 1, None), nums))
 
 
 def format_ecarts(numbers, label=''):
@@ -179,8 +208,8 @@ def format_ecarts(numbers, label=''):
     nums, ecarts = calculate_ecarts(numbers)
     if not nums:
         return f"{label} : Aucun résultat"
-    nums_str = ','.join(str(n) for n in nums)
-    ecarts_str = ','.join(str(e) for e in ecarts) if ecarts else '-'
+    nums_str = ','.join(map(str, nums))
+    ecarts_str = ','.join(map(str, ecarts)) if ecarts else '-'
     max_ecart = max(ecarts) if ecarts else 0
     return (
         f"{label}\n"
@@ -227,49 +256,52 @@ def build_category_stats(games):
         'face_suit_j': {f'{fc}{s}': [] for fc in FACE_CARDS for s in SUITS},
         'face_suit_b': {f'{fc}{s}': [] for fc in FACE_CARDS for s in SUITS},
     }
+    # Listes face_suit indexées par valeur puis costume : pas de clé f'{face}{suit}'
+    # construite pour chaque carte de chaque jeu
+    fs_j = {fc: {s: cats['face_suit_j'][f'{fc}{s}'] for s in SUITS} for fc in FACE_CARDS}
+    fs_b = {fc: {s: cats['face_suit_b'][f'{fc}{s}'] for s in SUITS} for fc in FACE_CARDS}
+    # (champ, sous-dict) résolus une fois : une lecture et un get() par champ et par jeu
+    single_fields = tuple((key, cats[key]) for key in
+                          ('victoire', 'parite', 'structure', 'plusmoins_j', 'plusmoins_b'))
+    multi_fields = tuple((key, cats[key]) for key in
+                         ('missing_j', 'missing_b', 'face_j', 'face_b'))
     for g in games:
         if g.get('face_j') is None and g.get('raw'):
             _backfill_face_data(g)
         n = g['numero']
-        if g['victoire'] in cats['victoire']:
-            cats['victoire'][g['victoire']].append(n)
-        if g['parite'] in cats['parite']:
-            cats['parite'][g['parite']].append(n)
-        if g['structure'] in cats['structure']:
-            cats['structure'][g['structure']].append(n)
-        if g['plusmoins_j'] in cats['plusmoins_j']:
-            cats['plusmoins_j'][g['plusmoins_j']].append(n)
-        if g['plusmoins_b'] in cats['plusmoins_b']:
-            cats['plusmoins_b'][g['plusmoins_b']].append(n)
-        for s in g['missing_j']:
-            if s in cats['missing_j']:
-                cats['missing_j'][s].append(n)
-        for s in g['missing_b']:
-            if s in cats['missing_b']:
-                cats['missing_b'][s].append(n)
-        for fc in g.get('face_j', set()):
-            if fc in cats['face_j']:
-                cats['face_j'][fc].append(n)
-        for fc in g.get('face_b', set()):
-            if fc in cats['face_b']:
-                cats['face_b'][fc].append(n)
+        for key, buckets in single_fields:
+            lst = buckets.get(g[key])
+            if lst is not None:
+                lst.append(n)
+        for key, buckets in multi_fields:
+            for v in g.get(key, ()):
+                lst = buckets.get(v)
+                if lst is not None:
+                    lst.append(n)
         for face, suit in g.get('face_suit_j', []):
-            key = f'{face}{suit}'
-            if key in cats['face_suit_j']:
-                cats['face_suit_j'][key].append(n)
+            lst = fs_j.get(face, {}).get(suit)
+            if lst is not None:
+                lst.append(n)
         for face, suit in g.get('face_suit_b', []):
-            key = f'{face}{suit}'
-            if key in cats['face_suit_b']:
-                cats['face_suit_b'][key].append(n)
+            lst = fs_b.get(face, {}).get(suit)
+            if lst is not None:
+                lst.append(n)
     return cats
 
 
+# Alias de costumes (clés en minuscules), construits une seule fois
+_SUIT_ALIASES = {
+    'spade': '♠', 'pique': '♠', '♠': '♠', '♠️': '♠',
+    'heart': '♥', 'coeur': '♥', 'cœur': '♥', '♥': '♥', '♥️': '♥',
+    'diamond': '♦', 'carreau': '♦', '♦': '♦', '♦️': '♦',
+    'club': '♣', 'trefle': '♣', 'trèfle': '♣', '♣': '♣', '♣️': '♣',
+}
+_CANONICAL_SUITS = frozenset(SUITS)
+
+
 def normalize_suit(s):
     """Normalise un symbole de costume saisi par l'utilisateur."""
-    aliases = {
-        'spade': '♠', 'pique': '♠', '♠': '♠', '♠️': '♠',
-        'heart': '♥', 'coeur': '♥', 'cœur': '♥', '♥': '♥', '♥️': '♥',
-        'diamond': '♦', 'carreau': '♦', '♦': '♦', '♦️': '♦',
-        'club': '♣', 'trefle': '♣', 'trèfle': '♣', '♣': '♣', '♣️': '♣',
-    }
-    return aliases.get(s.lower().strip(), None)
+    # Symbole déjà canonique : ni lower() ni strip()
+    if s in _CANONICAL_SUITS:
+        return s
+    return _SUIT_ALIASES.get(s.lower().strip(), None)
@@ -56,26 +56,33 @@ def _bootstrap_session():
     src_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
     if os.path.abspath(src_dir) == os.path.abspath(DATA_DIR):
         return
-    files_to_copy = [
+    files_to_copy = {
         'telethon_session.session',
         'auth_state.json',
         'last_sync.json',
         'predictions.json',
-    ]
-    for fname in files_to_copy:
-        src = os.path.join(src_dir, fname)
+    }
+    # Un listage par répertoire au lieu de deux stat() par fichier
+    try:
+        with os.scandir(src_dir) as it:
+            available = {e.name for e in it if e.name in files_to_copy}
+    except OSError:
+        return
+    with os.scandir(DATA_DIR) as it:
+        present = {e.name for e in it}
+    for fname in sorted(available - present):
         dst = os.path.join(DATA_DIR, fname)
-        if os.path.exists(src) and not os.path.exists(dst):
-            shutil.copy2(src, dst)
-            os.chmod(dst, 0o664)
-            logging.getLogger(__name__).info(f"Bootstrap: copié {fname} → {DATA_DIR}")
+        shutil.copy2(os.path.join(src_dir, fname), dst)
+        os.chmod(dst, 0o664)
+        logging.getLogger(__name__).info(f"Bootstrap: copié {fname} → {DATA_DIR}")
 
-# Tuer l'ancienne instance AVANT d'importer bot_handler
-_kill_previous_instance()
-_write_pid()
-_bootstrap_session()
-
-from bot_handler import setup_bot
+# Tuer l'ancienne instance AVANT d'importer bot_handler. Gardé par __main__ :
+# les processus 'spawn' du pool PDF réimportent ce module sous '__mp_main__'
+# et ne doivent ni tuer le processus parent ni réécrire le fichier PID.
+if __name__ == "__main__":
+    _kill_previous_instance()
+    _write_pid()
+    _bootstrap_session()
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -102,6 +109,8 @@ async def web_server():
     logger.info(f"Web server started on port {PORT}")
 
 async def main():
+    from bot_handler import setup_bot
+
     await web_server()
 
     application = setup_bot()
@@ -141,6 +150,8 @@ async def main():
         pass
     await application.stop()
     await application.shutdown()
+    # post_shutdown n'est appelé automatiquement que par run_polling/run_webhook
+    await application.post_shutdown(application)
 
 if __name__ == "__main__":
     asyncio.run(main())
@@ -1,7 +1,12 @@
+import io
 import re
+from collections import Counter
+from functools import lru_cache
 import pdfplumber
 import logging
 
+from game_analyzer import status_kind
+
 logger = logging.getLogger(__name__)
 
 # Pattern pour les messages bruts du canal
@@ -12,6 +17,13 @@ RAW_PATTERN = re.compile(
     re.IGNORECASE | re.DOTALL
 )
 
+# Ligne de tableau "x | ...N... | couleur [| statut]" : premier nombre de la
+# 2e cellule, 3e et 4e cellules (une seule passe par ligne, sans split)
+_TABLE_LINE_RE = re.compile(
+    r'^[^|\n]*\|[^|\d\n]*(\d+)[^|\n]*\|([^|\n]*)(?:\|([^|\n]*))?',
+    re.MULTILINE
+)
+
 # Mapping couleur → emoji
 COLOR_EMOJI_MAP = {
     '♣': '♣️',
@@ -31,89 +43,108 @@ COLOR_EMOJI_MAP = {
 }
 
 
+# Clés déjà en minuscules, dans l'ordre de priorité du mapping
+_COLOR_KEYS = tuple((key.lower(), emoji) for key, emoji in COLOR_EMOJI_MAP.items())
+
+
+@lru_cache(maxsize=4096)
 def get_color_emoji(couleur_str: str) -> str:
     """Extrait l'emoji de couleur depuis la chaîne brute."""
     s = couleur_str.strip().lower()
-    for key, emoji in COLOR_EMOJI_MAP.items():
-        if key.lower() in s:
+    for key, emoji in _COLOR_KEYS:
+        if key in s:
             return emoji
     # Si aucun mapping, retourner la chaîne brute tronquée
     return couleur_str.strip()[:20]
 
 
-def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extrait tout le texte d'un PDF page par page."""
-    text_parts = []
+def _table_rows(page):
+    """Lignes des tableaux d'une page, cellules jointes par ' | '."""
+    return [' | '.join(str(c) for c in row if c)
+            for table in page.extract_tables() for row in table if row]
+
+
+def iter_pdf_text(pdf_path):
+    """Produit le texte d'un PDF page par page (texte puis lignes de tableaux)."""
     with pdfplumber.open(pdf_path) as pdf:
         for page in pdf.pages:
             t = page.extract_text()
-            if t:
-                text_parts.append(t)
-            for table in page.extract_tables():
-                for row in table:
-                    if row:
-                        text_parts.append(' | '.join(str(c) for c in row if c))
-    return '\n'.join(text_parts)
+            text_parts = [t] if t else []
+            text_parts += _table_rows(page)
+            if text_parts:
+                yield '\n'.join(text_parts)
+
+
+def _new_prediction(numero, couleur_raw, statut):
+    """Entrée de la première occurrence d'un numéro ('count' posé en fin d'analyse)."""
+    return {
+        'numero': numero,
+        'couleur_emoji': get_color_emoji(couleur_raw),
+        'statut': statut[:60],
+        'kind': status_kind(statut),
+    }
+
 
+def _scan_raw(text, predictions, counts):
+    """Méthode 1 : pattern brut PRÉDICTION #X ... Couleur: Y.
+    Les doublons ne font qu'incrémenter le compteur."""
+    for match in RAW_PATTERN.finditer(text):
+        numero, couleur_raw, statut_raw = match.groups()
+        counts[numero] += 1
+        if numero not in predictions:
+            predictions[numero] = _new_prediction(
+                numero, couleur_raw.strip(), (statut_raw or '').strip()
+            )
+
+
+def _scan_table_lines(text, predictions, counts):
+    """Méthode 2 : lecture ligne par ligne des tableaux ("x | #N | couleur | statut")."""
+    for m in _TABLE_LINE_RE.finditer(text):
+        numero, couleur_raw, statut = m.groups()
+        counts[numero] += 1
+        if numero not in predictions:
+            predictions[numero] = _new_prediction(
+                numero, couleur_raw.strip(), (statut or '').strip()
+            )
 
-def analyze_pdf(pdf_path: str):
+
+def analyze_pdf(pdf_path):
     """
-    Analyse un PDF et extrait la liste des numéros prédits avec leur emoji de couleur.
+    Analyse un PDF (chemin ou objet fichier binaire, ex. io.BytesIO) et extrait la liste des numéros prédits avec leur emoji de couleur.
     Déduplique : si un numéro apparaît plusieurs fois, on garde une seule occurrence.
+    Le texte est analysé page par page, sans reconstituer le document entier.
 
     Retourne:
         list of dict: [{'numero': '1', 'couleur_emoji': '♣️', 'statut': '...', 'count': 2}, ...]
         str: texte extrait brut (pour debug si aucun résultat)
     """
-    text = extract_text_from_pdf(pdf_path)
+    # Première occurrence de chaque numéro + compteur d'occurrences (Counter)
+    predictions, counts = {}, Counter()
+    # Méthode 2, retenue seulement si la méthode 1 ne trouve rien
+    table_predictions, table_counts = {}, Counter()
+    head = ''
 
-    predictions = {}  # numero -> dict
+    for text in iter_pdf_text(pdf_path):
+        if len(head) < 500:
+            head = f"{head}\n{text}" if head else text
 
-    # --- Méthode 1 : pattern brut PRÉDICTION #X ... Couleur: Y ---
-    for match in RAW_PATTERN.finditer(text):
-        numero = match.group(1).strip()
-        couleur_raw = match.group(2).strip()
-        statut_raw = match.group(3).strip() if match.group(3) else ''
+        # Texte et lignes de tableaux de chaque page : tout est compté
+        _scan_raw(text, predictions, counts)
 
-        couleur_emoji = get_color_emoji(couleur_raw)
+        # --- Méthode 2 : inutile dès que la méthode 1 a trouvé quelque chose ---
+        if not predictions:
+            _scan_table_lines(text, table_predictions, table_counts)
 
-        if numero not in predictions:
-            predictions[numero] = {
-                'numero': numero,
-                'couleur_emoji': couleur_emoji,
-                'statut': statut_raw[:60],
-                'count': 1
-            }
-        else:
-            predictions[numero]['count'] += 1
-
-    # --- Méthode 2 : lecture ligne par ligne des tableaux ---
     if not predictions:
-        lines = text.split('\n')
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            parts = [p.strip() for p in line.split('|')]
-            if len(parts) >= 3:
-                num_match = re.search(r'#?(\d+)', parts[1]) if len(parts) > 1 else None
-                if num_match:
-                    numero = num_match.group(1)
-                    couleur_raw = parts[2] if len(parts) > 2 else ''
-                    statut = parts[3] if len(parts) > 3 else ''
-                    couleur_emoji = get_color_emoji(couleur_raw)
-                    if numero not in predictions:
-                        predictions[numero] = {
-                            'numero': numero,
-                            'couleur_emoji': couleur_emoji,
-                            'statut': statut.strip()[:60],
-                            'count': 1
-                        }
-                    else:
-                        predictions[numero]['count'] += 1
-                    continue
+        predictions, counts = table_predictions, table_counts
+    for numero, p in predictions.items():
+        p['count'] = counts[numero]
 
     # Trier par numéro
     result = sorted(predictions.values(), key=lambda x: int(x['numero']))
-    return result, text[:500] if not result else ''
+    return result, head[:500] if not result else ''
+
+
+def analyze_pdf_bytes(data: bytes):
+    """analyze_pdf sur un PDF en mémoire (point d'entrée picklable pour un pool de processus)."""
+    return analyze_pdf(io.BytesIO(data))
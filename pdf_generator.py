@@ -5,91 +5,142 @@ from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 from reportlab.lib.pagesizes import A4
 
-def generate_pdf(predictions, filters=None):
-    """Génère le PDF des prédictions"""
-    filename = f"/tmp/rapport_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
-    doc = SimpleDocTemplate(filename, pagesize="A4")
-    styles = getSampleStyleSheet()
+from game_analyzer import status_kind
+
+# Feuille de styles et styles des rapports construits une seule fois (lecture seule)
+_STYLES = getSampleStyleSheet()
+_REPORT_TITLE_STYLE = ParagraphStyle(
+    'Title', parent=_STYLES['Heading1'],
+    fontSize=18, textColor=colors.HexColor('#1a5276'),
+    alignment=TA_CENTER
+)
+_REPORT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#2874a6')),
+    ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
+    ('ALIGN', (0,0), (-1,-1), 'CENTER'),
+    ('GRID', (0,0), (-1,-1), 1, colors.grey),
+    ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+])
+# Couleur du statut dans le tableau du rapport
+_KIND_COLORS = {'won': 'green', 'lost': 'red', 'other': 'orange'}
+# Styles communs aux PDF de recherche
+_SEARCH_TITLE_STYLE = ParagraphStyle(
+    'Title', parent=_STYLES['Heading1'],
+    fontSize=16, textColor=colors.HexColor('#1a5276'),
+    alignment=TA_CENTER
+)
+_SEARCH_SUBTITLE_STYLE = ParagraphStyle(
+    'Subtitle', parent=_STYLES['Normal'],
+    fontSize=11, textColor=colors.HexColor('#555555'),
+    alignment=TA_CENTER
+)
+_SEARCH_BODY_STYLE = ParagraphStyle(
+    'Body', parent=_STYLES['Normal'],
+    fontSize=9, leading=12
+)
+
+# Styles du PDF de documentation
+_DOC_TITLE_STYLE = ParagraphStyle(
+    'DocTitle', parent=_STYLES['Heading1'],
+    fontSize=20, textColor=colors.HexColor('#1a5276'),
+    alignment=TA_CENTER, spaceAfter=6
+)
+_DOC_SECTION_STYLE = ParagraphStyle(
+    'Section', parent=_STYLES['Heading2'],
+    fontSize=14, textColor=colors.HexColor('#2874a6'),
+    spaceBefore=14, spaceAfter=6,
+    borderWidth=1, borderColor=colors.HexColor('#2874a6'),
+    borderPadding=4
+)
+_DOC_CMD_STYLE = ParagraphStyle(
+    'Cmd', parent=_STYLES['Normal'],
+    fontSize=10, leading=13, spaceBefore=6, spaceAfter=2,
+    textColor=colors.HexColor('#1a1a1a')
+)
+_DOC_EXAMPLE_STYLE = ParagraphStyle(
+    'Example', parent=_STYLES['Normal'],
+    fontSize=9, leading=12, leftIndent=20,
+    textColor=colors.HexColor('#444444'), spaceAfter=2
+)
+_DOC_NOTE_STYLE = ParagraphStyle(
+    'Note', parent=_STYLES['Normal'],
+    fontSize=9, leading=12, leftIndent=10,
+    textColor=colors.HexColor('#666666'),
+    spaceBefore=4, spaceAfter=6,
+    backColor=colors.HexColor('#f5f5f5')
+)
+_DOC_SUBTITLE_STYLE = ParagraphStyle(
+    'DocSubtitle', parent=_STYLES['Normal'],
+    fontSize=11, textColor=colors.HexColor('#555555'),
+    alignment=TA_CENTER, spaceAfter=20
+)
+
+def generate_pdf(predictions, filters=None, out=None):
+    """Génère le PDF des prédictions (dans `out` si fourni, sinon dans /tmp)"""
+    filename = out if out is not None else f"/tmp/rapport_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+    doc = SimpleDocTemplate(filename, pagesize=A4)
+    styles = _STYLES
     elements = []
     
     # Titre
-    title_style = ParagraphStyle(
-        'Title', parent=styles['Heading1'],
-        fontSize=18, textColor=colors.HexColor('#1a5276'),
-        alignment=TA_CENTER
-    )
-    elements.append(Paragraph("RAPPORT DES PRÉDICTIONS VIP", title_style))
+    elements.append(Paragraph("RAPPORT DES PRÉDICTIONS VIP", _REPORT_TITLE_STYLE))
     elements.append(Spacer(1, 20))
     
-    # Stats
+    # Stats et lignes du tableau en un seul parcours ; 'kind' est posé à l'ingestion
+    # (recalculé seulement pour les anciens enregistrements)
     total = len(predictions)
-    gagnes = len([p for p in predictions if 'gagn' in p['statut'].lower()])
-    perdus = len([p for p in predictions if 'perd' in p['statut'].lower()])
+    kinds = {'won': 0, 'lost': 0, 'other': 0}
+    # Un Paragraph par statut distinct : le balisage n'est analysé qu'une fois
+    # (cache local à l'appel, les builds pouvant tourner dans plusieurs threads)
+    statut_paras = {}
+    data = [['#', 'Numéro', 'Couleur', 'Statut', 'Date']]
+    for i, p in enumerate(predictions, 1):
+        statut = p['statut']
+        kind = p.get('kind') or status_kind(statut)
+        kinds[kind] += 1
+        if i > 1000:
+            continue
+
+        date_str = p['date'][:10] if isinstance(p['date'], str) else str(p['date'])[:10]
+        
+        # Couleur du statut
+        para = statut_paras.get((statut, kind))
+        if para is None:
+            para = statut_paras[statut, kind] = Paragraph(
+                f"<font color='{_KIND_COLORS[kind]}'>{statut}</font>", styles['Normal']
+            )
+        data.append([
+            str(i),
+            f"#{p['numero']}",
+            p['couleur'],
+            para,
+            date_str
+        ])
     
-    stats = f"Total: {total} | Gagnés: {gagnes} | Perdus: {perdus}"
+    stats = f"Total: {total} | Gagnés: {kinds['won']} | Perdus: {kinds['lost']}"
     elements.append(Paragraph(stats, styles['Normal']))
     elements.append(Spacer(1, 20))
     
     # Tableau
     if predictions:
-        data = [['#', 'Numéro', 'Couleur', 'Statut', 'Date']]
-        
-        for i, p in enumerate(predictions[:1000], 1):
-            date_str = p['date'][:10] if isinstance(p['date'], str) else str(p['date'])[:10]
-            
-            # Couleur du statut
-            statut = p['statut']
-            if 'gagn' in statut.lower():
-                statut_html = f"<font color='green'>{statut}</font>"
-            elif 'perd' in statut.lower():
-                statut_html = f"<font color='red'>{statut}</font>"
-            else:
-                statut_html = f"<font color='orange'>{statut}</font>"
-            
-            data.append([
-                str(i),
-                f"#{p['numero']}",
-                p['couleur'],
-                Paragraph(statut_html, styles['Normal']),
-                date_str
-            ])
-        
         table = Table(data, colWidths=[40, 80, 120, 150, 80])
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0,0), (-1,0), colors.HexColor('#2874a6')),
-            ('TEXTCOLOR', (0,0), (-1,0), colors.whitesmoke),
-            ('ALIGN', (0,0), (-1,-1), 'CENTER'),
-            ('GRID', (0,0), (-1,-1), 1, colors.grey),
-            ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ]))
+        table.setStyle(_REPORT_TABLE_STYLE)
         elements.append(table)
     
     doc.build(elements)
     return filename
 
 
-def generate_search_pdf(results, keywords):
-    """Génère un PDF avec les résultats de recherche par mots-clés"""
-    filename = f"/tmp/recherche_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+def generate_search_pdf(results, keywords, out=None):
+    """Génère un PDF avec les résultats de recherche par mots-clés (dans `out` si fourni)"""
+    filename = out if out is not None else f"/tmp/recherche_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
     doc = SimpleDocTemplate(filename, pagesize=A4)
-    styles = getSampleStyleSheet()
+    styles = _STYLES
+    title_style = _SEARCH_TITLE_STYLE
+    subtitle_style = _SEARCH_SUBTITLE_STYLE
+    body_style = _SEARCH_BODY_STYLE
     elements = []
 
-    title_style = ParagraphStyle(
-        'Title', parent=styles['Heading1'],
-        fontSize=16, textColor=colors.HexColor('#1a5276'),
-        alignment=TA_CENTER
-    )
-    subtitle_style = ParagraphStyle(
-        'Subtitle', parent=styles['Normal'],
-        fontSize=11, textColor=colors.HexColor('#555555'),
-        alignment=TA_CENTER
-    )
-    body_style = ParagraphStyle(
-        'Body', parent=styles['Normal'],
-        fontSize=9, leading=12
-    )
-
     elements.append(Paragraph("RECHERCHE DANS LES MESSAGES", title_style))
     elements.append(Spacer(1, 6))
     elements.append(Paragraph(f"Mots-clés: {', '.join(keywords)}", subtitle_style))
@@ -111,28 +162,16 @@ def generate_search_pdf(results, keywords):
     return filename
 
 
-def generate_channel_search_pdf(messages, keywords, channel_title=''):
-    """Génère un PDF avec les messages bruts trouvés directement dans le canal"""
-    filename = f"/tmp/canal_recherche_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
+def generate_channel_search_pdf(messages, keywords, channel_title='', out=None):
+    """Génère un PDF avec les messages bruts trouvés directement dans le canal (dans `out` si fourni)"""
+    filename = out if out is not None else f"/tmp/canal_recherche_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
     doc = SimpleDocTemplate(filename, pagesize=A4)
-    styles = getSampleStyleSheet()
+    styles = _STYLES
+    title_style = _SEARCH_TITLE_STYLE
+    subtitle_style = _SEARCH_SUBTITLE_STYLE
+    body_style = _SEARCH_BODY_STYLE
     elements = []
 
-    title_style = ParagraphStyle(
-        'Title', parent=styles['Heading1'],
-        fontSize=16, textColor=colors.HexColor('#1a5276'),
-        alignment=TA_CENTER
-    )
-    subtitle_style = ParagraphStyle(
-        'Subtitle', parent=styles['Normal'],
-        fontSize=11, textColor=colors.HexColor('#555555'),
-        alignment=TA_CENTER
-    )
-    body_style = ParagraphStyle(
-        'Body', parent=styles['Normal'],
-        fontSize=9, leading=12
-    )
-
     header_title = f"RECHERCHE — {channel_title}" if channel_title else "RECHERCHE DANS LE CANAL TELEGRAM"
     elements.append(Paragraph(header_title, title_style))
     elements.append(Spacer(1, 6))
@@ -159,42 +198,12 @@ def generate_documentation_pdf(is_main_admin=True):
     filename = f"/tmp/documentation_vip_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf"
     doc = SimpleDocTemplate(filename, pagesize=A4, topMargin=30, bottomMargin=30,
                             leftMargin=40, rightMargin=40)
-    styles = getSampleStyleSheet()
-
-    title_style = ParagraphStyle(
-        'DocTitle', parent=styles['Heading1'],
-        fontSize=20, textColor=colors.HexColor('#1a5276'),
-        alignment=TA_CENTER, spaceAfter=6
-    )
-    section_style = ParagraphStyle(
-        'Section', parent=styles['Heading2'],
-        fontSize=14, textColor=colors.HexColor('#2874a6'),
-        spaceBefore=14, spaceAfter=6,
-        borderWidth=1, borderColor=colors.HexColor('#2874a6'),
-        borderPadding=4
-    )
-    cmd_style = ParagraphStyle(
-        'Cmd', parent=styles['Normal'],
-        fontSize=10, leading=13, spaceBefore=6, spaceAfter=2,
-        textColor=colors.HexColor('#1a1a1a')
-    )
-    example_style = ParagraphStyle(
-        'Example', parent=styles['Normal'],
-        fontSize=9, leading=12, leftIndent=20,
-        textColor=colors.HexColor('#444444'), spaceAfter=2
-    )
-    note_style = ParagraphStyle(
-        'Note', parent=styles['Normal'],
-        fontSize=9, leading=12, leftIndent=10,
-        textColor=colors.HexColor('#666666'),
-        spaceBefore=4, spaceAfter=6,
-        backColor=colors.HexColor('#f5f5f5')
-    )
-    subtitle_style = ParagraphStyle(
-        'DocSubtitle', parent=styles['Normal'],
-        fontSize=11, textColor=colors.HexColor('#555555'),
-        alignment=TA_CENTER, spaceAfter=20
-    )
+    title_style = _DOC_TITLE_STYLE
+    section_style = _DOC_SECTION_STYLE
+    cmd_style = _DOC_CMD_STYLE
+    example_style = _DOC_EXAMPLE_STYLE
+    note_style = _DOC_NOTE_STYLE
+    subtitle_style = _DOC_SUBTITLE_STYLE
 
     el = []
     el.append(Paragraph("DOCUMENTATION COMPL\u00c8TE", title_style))
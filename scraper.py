@@ -1,5 +1,6 @@
 import re
 import os
+import asyncio
 from telethon import TelegramClient
 from telethon.sessions import StringSession
 from telethon.tl.types import Channel, PeerChannel
@@ -32,13 +33,43 @@ def _load_session_string():
     return TELETHON_SESSION_STRING
 
 
+# Sérialise les accès au client persistant (voir Scraper.ensure_connected)
+_client_lock = asyncio.Lock()
+
+
 class Scraper:
     def __init__(self):
         self._make_client()
+        self._pooled = None
+        self._pooled_session = None
 
     def _make_client(self):
         self.client = TelegramClient(StringSession(_load_session_string()), API_ID, API_HASH)
 
+    async def ensure_connected(self):
+        """Retourne un client connecté en permanence pour les requêtes ponctuelles.
+
+        La poignée de main MTProto n'est faite qu'une fois ; le client est
+        recréé seulement si la session a changé (nouvelle authentification).
+        À appeler sous `_client_lock`.
+        """
+        session = _load_session_string()
+        if self._pooled is None or self._pooled_session != session:
+            if self._pooled is not None:
+                await self._pooled.disconnect()
+            self._pooled = TelegramClient(StringSession(session), API_ID, API_HASH)
+            self._pooled_session = session
+        if not self._pooled.is_connected():
+            await self._pooled.connect()
+        return self._pooled
+
+    async def close_pooled(self):
+        """Ferme le client persistant d'ensure_connected (à l'arrêt du bot)."""
+        if self._pooled is not None:
+            await self._pooled.disconnect()
+            self._pooled = None
+            self._pooled_session = None
+
     async def _get_channel(self):
         """Trouve le canal par ID numérique, puis par nom si besoin."""
         # 1. Essai par ID numérique direct (le plus fiable)
@@ -235,7 +266,24 @@ class Scraper:
         Retourne: (records, title, cancelled)
             records : liste de dicts {'text': str, 'date': str}
         """
+        info = {}
+        records = [rec async for rec in self.iter_game_records(
+            channel_id, limit=limit, from_date=from_date, to_date=to_date,
+            progress_callback=progress_callback, cancel_check=cancel_check, info=info
+        )]
+        return records, info.get('title', str(channel_id)), info.get('cancelled', False)
+
+    async def iter_game_records(self, channel_id: str, limit=None, from_date=None,
+                                to_date=None, progress_callback=None, cancel_check=None,
+                                info=None):
+        """Version flux de get_game_records : produit les dicts {'text', 'date'} un par un.
+
+        `info` (dict optionnel) reçoit 'title' dès la résolution du canal et
+        'cancelled' en fin de parcours.
+        """
         from game_analyzer import GAME_PATTERN
+        if info is None:
+            info = {}
         self._make_client()
         await self.client.connect()
 
@@ -254,13 +302,14 @@ class Scraper:
                 from telethon.tl.types import PeerChannel
                 entity = await self.client.get_entity(PeerChannel(abs(cid) % 10**10))
 
-            records = []
+            info['title'] = entity.title if hasattr(entity, 'title') else str(channel_id)
+            info['cancelled'] = False
             checked = 0
-            cancelled = False
+            found = 0
 
             async for message in self.client.iter_messages(entity, limit=limit):
                 if cancel_check and cancel_check():
-                    cancelled = True
+                    info['cancelled'] = True
                     break
 
                 if not message.text:
@@ -274,16 +323,13 @@ class Scraper:
 
                 checked += 1
                 txt = message.text
-                date_str = str(message.date) if message.date else ''
                 if GAME_PATTERN.search(txt) or (
                     '🔰' in txt and '#N' in txt and '#T' in txt
                 ):
-                    records.append({'text': txt, 'date': date_str})
+                    found += 1
+                    yield {'text': txt, 'date': str(message.date) if message.date else ''}
                 if progress_callback and checked % 200 == 0:
-                    await progress_callback(checked, len(records))
-
-            title = entity.title if hasattr(entity, 'title') else str(channel_id)
-            return records, title, cancelled
+                    await progress_callback(checked, found)
 
         finally:
             await self.client.disconnect()
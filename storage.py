@@ -1,6 +1,9 @@
+import html
 import json
 import os
+import time
 from datetime import datetime
+from game_analyzer import status_kind
 from config import PREDICTIONS_FILE, LAST_SYNC_FILE, CHANNELS_FILE, GAMES_FILE, ADMINS_FILE, ADMIN_ID, ensure_data_dir
 
 ensure_data_dir()
@@ -30,8 +33,32 @@ def load_json(filepath, default=None):
         return default if default is not None else {}
 
 def save_json(filepath, data):
-    with open(filepath, 'w', encoding='utf-8') as f:
+    # Écriture atomique (fichier temporaire puis os.replace) : une lecture
+    # concurrente, ex. depuis un autre thread, ne voit jamais un fichier à moitié écrit
+    tmp = filepath + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
         json.dump(data, f, ensure_ascii=False, indent=2, default=str)
+    os.replace(tmp, filepath)
+    _mtime_cache.pop(filepath, None)
+
+# Cache des fichiers JSON relus souvent : {chemin: ((mtime_ns, taille), données)}
+# Relu seulement si le fichier a changé sur disque ; vidé par save_json.
+_mtime_cache: dict[str, tuple[tuple, object]] = {}
+
+def _load_json_cached(filepath, default):
+    """load_json avec cache validé par (mtime, taille) du fichier. Ne pas muter le résultat."""
+    try:
+        st = os.stat(filepath)
+    except OSError:
+        _mtime_cache.pop(filepath, None)
+        return default
+    key = (st.st_mtime_ns, st.st_size)
+    hit = _mtime_cache.get(filepath)
+    if hit is not None and hit[0] == key:
+        return hit[1]
+    data = load_json(filepath, default)
+    _mtime_cache[filepath] = (key, data)
+    return data
 
 def add_prediction(message_id, numero, couleur, statut, raw_text):
     predictions = load_json(PREDICTIONS_FILE, [])
@@ -44,6 +71,7 @@ def add_prediction(message_id, numero, couleur, statut, raw_text):
         'numero': numero,
         'couleur': couleur,
         'statut': statut,
+        'kind': status_kind(statut),
         'raw_text': raw_text,
         'date': datetime.now().isoformat()
     })
@@ -127,6 +155,8 @@ def clear_all():
                     os.remove(os.path.join(data_dir, f))
                 except:
                     pass
+    _invalidate_admin_caches()
+    _bump_games_version()
 
 def reset_all_data():
     """Efface absolument tout sauf la session enregistrée."""
@@ -144,22 +174,36 @@ def reset_all_data():
                     shutil.rmtree(path)
             except:
                 pass
+    _invalidate_admin_caches()
+    _bump_games_version()
 
 # ── Gestion des canaux de recherche ──────────────────────────────────────────
 
+def _channel_name_html(ch: dict) -> str:
+    """Nom d'affichage du canal, échappé pour le HTML Telegram."""
+    return html.escape(ch.get('name') or ch['id'], quote=False)
+
 def get_channels():
-    return load_json(CHANNELS_FILE, [])
+    channels = _load_json_cached(CHANNELS_FILE, [])
+    # Anciens enregistrements : nom HTML calculé une fois puis gardé dans le cache
+    for ch in channels:
+        if 'name_html' not in ch:
+            ch['name_html'] = _channel_name_html(ch)
+    # Copies des entrées : les appelants peuvent les modifier avant save_json
+    return [dict(ch) for ch in channels]
 
 def add_channel(channel_id: str, name: str = '') -> bool:
     channels = get_channels()
     if any(ch['id'] == str(channel_id) for ch in channels):
         return False
-    channels.append({
+    channel = {
         'id': str(channel_id),
         'name': name,
         'active': len(channels) == 0,
         'added_date': datetime.now().strftime('%Y-%m-%d %H:%M'),
-    })
+    }
+    channel['name_html'] = _channel_name_html(channel)
+    channels.append(channel)
     save_json(CHANNELS_FILE, channels)
     return True
 
@@ -182,20 +226,49 @@ def set_active_channel(channel_id: str):
 
 # ── Jeux analysés ─────────────────────────────────────────────────────────────
 
+# Compteur bumpé à chaque écriture/effacement des jeux : sert de clé aux caches dérivés
+_games_version = 0
+
+def games_version() -> int:
+    return _games_version
+
+def _bump_games_version():
+    global _games_version
+    _games_version += 1
+
 def get_analyzed_games():
-    return load_json(GAMES_FILE, [])
+    """Jeux analysés, relus du disque seulement si le fichier a changé.
+
+    La liste retournée est partagée entre les commandes : ne pas la modifier.
+    """
+    games = _load_json_cached(GAMES_FILE, [])
+    # Anciens enregistrements : numéro entier absent, calculé une fois au chargement
+    for g in games:
+        if 'numero_int' not in g:
+            g['numero_int'] = int(g['numero'])
+    return games
+
+def analyzed_games_signature():
+    """(mtime_ns, taille) du fichier des jeux : change à chaque réécriture, None s'il est absent."""
+    try:
+        st = os.stat(GAMES_FILE)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
 
 def save_analyzed_games(games: list):
     save_json(GAMES_FILE, games)
+    _bump_games_version()
 
 def clear_analyzed_games():
     save_json(GAMES_FILE, [])
+    _bump_games_version()
 
 # ── Administrateurs dynamiques avec permissions ────────────────────────────────
 
 def _load_admins_raw() -> dict:
     """Charge le fichier admins et migre l'ancien format liste → dict si nécessaire."""
-    raw = load_json(ADMINS_FILE, {})
+    raw = _load_json_cached(ADMINS_FILE, {})
     if isinstance(raw, list):
         # Migration : ancien format [id1, id2] → nouveau {id1: ALL_COMMANDS}
         migrated = {}
@@ -203,10 +276,11 @@ def _load_admins_raw() -> dict:
             migrated[str(uid)] = list(ALL_COMMANDS)
         save_json(ADMINS_FILE, migrated)
         return migrated
-    return raw
+    return dict(raw)
 
 def _save_admins_raw(data: dict):
     save_json(ADMINS_FILE, data)
+    _invalidate_admin_caches()
 
 def get_admins() -> list:
     """Retourne la liste des IDs admin (toujours inclus : ADMIN_ID principal)."""
@@ -225,7 +299,7 @@ def get_admins_with_permissions() -> dict:
     for k, v in raw.items():
         uid = int(k)
         if uid != ADMIN_ID:
-            result[uid] = v if isinstance(v, list) else list(ALL_COMMANDS)
+            result[uid] = list(v) if isinstance(v, list) else list(ALL_COMMANDS)
     return result
 
 def get_admin_permissions(user_id: int) -> list:
@@ -236,14 +310,46 @@ def get_admin_permissions(user_id: int) -> list:
     entry = raw.get(str(user_id))
     if entry is None:
         return []
-    return entry if isinstance(entry, list) else list(ALL_COMMANDS)
+    return list(entry) if isinstance(entry, list) else list(ALL_COMMANDS)
+
+# Cache des permissions par admin : {user_id: (horodatage, frozenset(commandes))}
+# Vidé à chaque écriture du fichier admins, et expiré après _PERM_CACHE_TTL secondes
+# pour rattraper une modification manuelle du fichier.
+_PERM_CACHE_TTL = 60.0
+_perm_cache: dict[int, tuple[float, frozenset]] = {}
+
+_admin_ids_cache: dict = {'ts': 0.0, 'ids': None}
+
+def _invalidate_admin_caches():
+    _perm_cache.clear()
+    _admin_ids_cache['ids'] = None
+
+def get_admin_id_set() -> frozenset:
+    """Comme get_admins, mais sous forme de frozenset mis en cache."""
+    now = time.monotonic()
+    ids = _admin_ids_cache['ids']
+    if ids is not None and now - _admin_ids_cache['ts'] < _PERM_CACHE_TTL:
+        return ids
+    ids = frozenset(get_admins())
+    _admin_ids_cache['ts'] = now
+    _admin_ids_cache['ids'] = ids
+    return ids
+
+def get_admin_permission_set(user_id: int) -> frozenset:
+    """Comme get_admin_permissions, mais sous forme de frozenset mis en cache."""
+    now = time.monotonic()
+    hit = _perm_cache.get(user_id)
+    if hit is not None and now - hit[0] < _PERM_CACHE_TTL:
+        return hit[1]
+    perms = frozenset(get_admin_permissions(user_id))
+    _perm_cache[user_id] = (now, perms)
+    return perms
 
 def has_permission(user_id: int, command: str) -> bool:
     """Vérifie si un admin peut utiliser une commande."""
     if user_id == ADMIN_ID:
         return True
-    perms = get_admin_permissions(user_id)
-    return command in perms
+    return command in get_admin_permission_set(user_id)
 
 def add_admin(user_id: int, commands: list = None) -> bool:
     """Ajoute un admin avec sa liste de commandes autorisées."""